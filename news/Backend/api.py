@@ -1,26 +1,34 @@
 # filename: api.py
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any
-import asyncio
+from typing import Optional
 import os
+import orjson
 from dotenv import load_dotenv
 import uuid
 from datetime import datetime
+from arq import create_pool
+from arq.connections import ArqRedis, RedisSettings
+from arq.constants import default_queue_name
 
-# Import the core analysis function from final_main.py
-from final_main import analyze_article
+# Analyses run in worker.py (arq); the API only enqueues jobs and reads results from Redis
+import redis_cache
 
 # Load environment variables to check for them
 load_dotenv()
 
+# Reject new work once this many analyses are waiting for a worker
+MAX_QUEUED_ANALYSES = int(os.getenv("MAX_QUEUED_ANALYSES", "20"))
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="News Authenticity Engine API",
     description="An API to analyze news articles for credibility, bias, and factual accuracy.",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -40,39 +48,67 @@ class AnalysisTask(BaseModel):
     status: str
     message: str
 
-# --- In-memory storage for async results (for production, use Redis or a database) ---
-analysis_results: Dict[str, Dict[str, Any]] = {}
-
-# --- Background Task Runner ---
-async def run_analysis_in_background(request_id: str, user_input: str):
-    """The function that the background task will run."""
-    try:
-        # Call the main analysis function and get the result
-        result_data = await analyze_article(user_input)
-        analysis_results[request_id] = {
-            "status": "completed",
-            "data": result_data
-        }
-    except Exception as e:
-        print(f"Background analysis failed for {request_id}: {e}")
-        analysis_results[request_id] = {
-            "status": "error",
-            "data": {"error_message": str(e)}
-        }
+# --- Redis connections: results/caches, plus the arq job queue the worker consumes ---
+arq_pool: Optional[ArqRedis] = None
+
+@app.on_event("startup")
+async def connect_redis():
+    global arq_pool
+    redis_cache.connect()
+    arq_pool = await create_pool(RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+
+@app.on_event("shutdown")
+async def close_redis():
+    await redis_cache.close()
+    if arq_pool is not None:
+        await arq_pool.aclose()
 
 # --- API Endpoints ---
 @app.post("/analyze", response_model=AnalysisTask)
-async def analyze_article_endpoint(item: ArticleInput, background_tasks: BackgroundTasks):
+async def analyze_article_endpoint(item: ArticleInput):
     """
-    Accepts an article for analysis and processes it in the background.
+    Accepts an article for analysis and queues it for a worker.
     """
     if not all([os.getenv("TOGETHER_AI_API_KEY"), os.getenv("GOOGLE_API_KEY"), os.getenv("OPENAI_API_KEY")]):
         raise HTTPException(status_code=500, detail="Server configuration error: API keys are not set.")
 
     request_id = str(uuid.uuid4())
-    analysis_results[request_id] = {"status": "processing"}
-    
-    background_tasks.add_task(run_analysis_in_background, request_id, item.input_content)
+
+    # Serve repeat submissions of the same content without re-running the pipeline
+    cached = await redis_cache.load_cached_verdict(item.input_content)
+    if cached:
+        await redis_cache.save_analysis_result(request_id, {"status": "completed", "data": cached})
+        return AnalysisTask(
+            request_id=request_id,
+            status="completed",
+            message="Returning a cached analysis. Fetch it from the /results/{request_id} endpoint."
+        )
+
+    # Recorded before the in-flight claim publishes request_id, so a duplicate submitter polling it never sees a 404
+    await redis_cache.save_analysis_result(request_id, {"status": "processing", "timestamp": datetime.now().isoformat()})
+
+    # Attach duplicate submissions to the analysis already running for the same content
+    existing_request_id = await redis_cache.claim_inflight(item.input_content, request_id)
+    if existing_request_id:
+        await redis_cache.delete_analysis_result(request_id)
+        return AnalysisTask(
+            request_id=existing_request_id,
+            status="processing",
+            message="This content is already being analyzed. Check the /results/{request_id} endpoint for status."
+        )
+
+    # Apply backpressure instead of letting the queue grow without bound
+    if await arq_pool.zcard(default_queue_name) >= MAX_QUEUED_ANALYSES:
+        await redis_cache.release_inflight(item.input_content)
+        # Duplicates may already have attached to request_id; they get a final answer rather than a 404
+        await redis_cache.save_analysis_result(request_id, {"status": "error", "data": {"error_message": "Server was busy. Please resubmit."}})
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy analyzing other articles. Please retry shortly.",
+            headers={"Retry-After": "30"}
+        )
+
+    await arq_pool.enqueue_job("analyze_task", request_id, item.input_content)
     
     return AnalysisTask(
         request_id=request_id,
@@ -85,11 +121,26 @@ async def get_analysis_result(request_id: str):
     """
     Retrieves the result of a background analysis task.
     """
-    result = analysis_results.get(request_id)
+    result = await redis_cache.load_analysis_result(request_id)
     if not result:
         raise HTTPException(status_code=404, detail="Request ID not found.")
     return result
 
+@app.get("/results/{request_id}/stream")
+async def stream_analysis_result(request_id: str):
+    """
+    Server-Sent Events alternative to polling /results/{request_id}: sends a single
+    event carrying the final result as soon as the worker publishes it.
+    """
+    if not await redis_cache.load_analysis_result(request_id):
+        raise HTTPException(status_code=404, detail="Request ID not found.")
+
+    async def result_events():
+        result = await redis_cache.wait_for_analysis_result(request_id)
+        yield f"data: {orjson.dumps(result).decode()}\n\n"
+
+    return StreamingResponse(result_events(), media_type="text/event-stream")
+
 @app.get("/", include_in_schema=False)
 async def root():
     return {"message": "News Authenticity Engine API is running. See /docs for details."}
\ No newline at end of file
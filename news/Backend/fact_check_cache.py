@@ -0,0 +1,39 @@
+# filename: fact_check_cache.py
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Optional
+
+# Google Fact Check results per claim, persisted so a claim seen in an earlier run (common talking
+# points recur across articles) skips the API round-trip and its quota unit.
+FACT_CHECK_CACHE_PATH = os.getenv("FACT_CHECK_CACHE_PATH", "_fact_check_cache.sqlite")
+FACT_CHECK_CACHE_TTL_SECONDS = 86400  # New fact-checks get published, so results are only trusted for a day
+
+_db: Optional[sqlite3.Connection] = None
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(FACT_CHECK_CACHE_PATH)
+        _db.execute("CREATE TABLE IF NOT EXISTS fact_check_cache (key TEXT PRIMARY KEY, value TEXT, ts INTEGER)")
+    return _db
+
+def make_key(normalized_claim: str) -> str:
+    return hashlib.sha256(normalized_claim.encode()).hexdigest()
+
+def get_many(keys: list[str]) -> dict[str, str]:
+    """Returns the unexpired cached result for each key that has one."""
+    if not keys: return {}
+    placeholders = ",".join("?" * len(keys))
+    rows = _connect().execute(f"SELECT key, value, ts FROM fact_check_cache WHERE key IN ({placeholders})", keys).fetchall()
+    now = time.time()
+    return {key: value for key, value, ts in rows if now - ts < FACT_CHECK_CACHE_TTL_SECONDS}
+
+def set_many(values: dict[str, str]):
+    if not values: return
+    db = _connect()
+    now = int(time.time())
+    db.executemany("INSERT OR REPLACE INTO fact_check_cache (key, value, ts) VALUES (?, ?, ?)", [(key, value, now) for key, value in values.items()])
+    db.commit()
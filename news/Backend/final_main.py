@@ -2,13 +2,17 @@
 
 import asyncio
 import os
-import json
+import orjson
 import httpx
 from dotenv import load_dotenv
 import urllib.parse
 import re
-from typing import List
+import hashlib
+from functools import lru_cache
+from typing import List, Optional
 
+from aiolimiter import AsyncLimiter
+from lxml import etree, html as lxml_html
 from pydantic import BaseModel, Field
 
 from crawl4ai import (
@@ -17,10 +21,15 @@ from crawl4ai import (
     BrowserConfig,
     LLMExtractionStrategy,
     LLMConfig,
-    LXMLWebScrapingStrategy,
-    JsonCssExtractionStrategy
+    LXMLWebScrapingStrategy
 )
 
+from source_tiering import build_tier_trie, lookup_tier
+from pipeline_utils import normalize_claim, dedupe_claims, trusted_sites_query, encode_sites_suffix, build_google_url, run
+import redis_cache
+import semantic_cache
+import page_cache
+
 # --- Load Environment & Configurations ---
 load_dotenv()
 
@@ -35,7 +44,31 @@ LLM_PROVIDER_STRING = "together_ai/meta-llama/Llama-3-8b-chat-hf"
 
 # --- Constants ---
 GOOGLE_FACT_CHECK_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
-CONCURRENCY_LIMIT = 2
+BROWSER_CONFIG = BrowserConfig(headless=True, verbose=False)
+# Synthesis requests are paced by the account's request-per-minute budget rather than a fixed concurrency
+# cap, so they only wait when that budget is actually used up. Shared by every analysis in the process.
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", 60))
+_openai_limiter = AsyncLimiter(max_rate=OPENAI_RPM, time_period=60)
+# Upper bound on outstanding fact-check requests / SERP pages, so large claim lists queue instead of
+# opening hundreds of sockets (and collecting Google 429s)
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", 20))
+# One bound per process, shared by every concurrent batch_query_fact_checks call (e.g. verify_claims groups)
+_fact_check_slots = asyncio.Semaphore(MAX_INFLIGHT)
+EVIDENCE_CACHE_TTL = 86400  # Fact-checks and corroboration for a claim are reused for a day
+# Verdicts are deterministic for identical evidence; run Redis with maxmemory-policy allkeys-lfu so hot claims stay cached
+SYNTHESIS_CACHE_TTL = 7 * 86400
+# Claim extraction is keyed by the SHA-256 of the whole article, so only byte-identical content is reused
+DECONSTRUCT_CACHE_TTL = 7 * 86400
+
+# --- Shared HTTP Client: one connection pool (TLS sessions, HTTP/2 streams) for every API call ---
+_client = httpx.AsyncClient(
+    timeout=180.0,
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+)
+
+async def close_http_client():
+    await _client.aclose()
 
 # --- Source Tiering ---
 SOURCE_TIERS = {
@@ -46,27 +79,50 @@ SOURCE_TIERS = {
     "theonion.com": "satire"
 }
 
+# This script's tier list uses the same suffix trie as source_tiering, so subdomains such as
+# edition.cnn.com or www.reuters.com resolve to the most specific listed domain
+_TIER_TRIE = build_tier_trie(SOURCE_TIERS)
+
+# SOURCE_TIERS never changes at runtime, so a URL's tier can be memoized
+@lru_cache(maxsize=4096)
 def get_source_tier(url: str):
     if not url.startswith('http'): return 3
-    domain = urllib.parse.urlparse(url).netloc.replace("www.", "")
-    return SOURCE_TIERS.get(domain, 3)
+    host = urllib.parse.urlsplit(url).hostname or ""  # lowercased, without port or credentials
+    tier = lookup_tier(host, _TIER_TRIE)
+    return 3 if tier is None else tier
+
+# SOURCE_TIERS is static, so the trusted (Tier 1 & 2) site: filter is built once at import
+_TRUSTED_DOMAINS = tuple(domain for domain, tier in SOURCE_TIERS.items() if tier in (1, 2))
+_TRUSTED_SITES_Q_ENCODED = encode_sites_suffix(trusted_sites_query(_TRUSTED_DOMAINS))
+# Part of the corroboration cache key, so editing SOURCE_TIERS invalidates old searches
+_TRUSTED_DOMAINS_HASH = hashlib.sha1(",".join(sorted(_TRUSTED_DOMAINS)).encode()).hexdigest()[:12]
+
+def claim_cache_key(prefix: str, claim: str) -> str:
+    return f"{prefix}:{hashlib.sha1(normalize_claim(claim).encode()).hexdigest()}"
 
 # --- Pydantic Schemas for Structured LLM Output ---
 class DeconstructionResult(BaseModel):
     bias_report: str = Field(description="A 2-3 sentence analysis of the article's tone, framing, and potential bias. Conclude with 'Bias rating: [1-5]'.")
     claims: List[str] = Field(description="A list of up to 7 of the most significant, verifiable factual claims from the article.")
 
+# Generated once; Pydantic rebuilds the JSON schema from scratch on every model_json_schema() call
+_DR_SCHEMA = DeconstructionResult.model_json_schema()
+
 # --- ANALYSIS PIPELINE ---
 
 ### PHASE 1: INGESTION
 async def phase1_ingest_content(crawler: AsyncWebCrawler, input_content: str):
     print("Phase 1: Ingesting and cleaning content...")
+    # An unchanged page (ETag / Last-Modified still match) or previously seen raw text skips the browser
+    cached_html = await page_cache.load(_client, "cleaned_html", input_content)
+    if cached_html is not None: return {"tier": get_source_tier(input_content), "html_content": cached_html, "error": None}
     config = CrawlerRunConfig(
         css_selector="[data-testid='ArticleBody'], div._s30J, article, .post-content, .article-body, #main-content, .main, [role='main']",
         scraping_strategy=LXMLWebScrapingStrategy()
     )
     result = await crawler.arun(input_content, config=config)
     if result.success and result.cleaned_html:
+        page_cache.store("cleaned_html", input_content, result.cleaned_html, result.response_headers)
         return {"tier": get_source_tier(input_content), "html_content": result.cleaned_html, "error": None}
     return {"error": result.error_message or "Could not extract main article content.", "tier": None, "html_content": None}
 
@@ -75,76 +131,130 @@ async def phase2_deconstruct_article(crawler: AsyncWebCrawler, html_content: str
     print(f"Phase 2: Extracting claims and analyzing bias (Model: {LLM_PROVIDER_STRING})...")
     extraction_strategy = LLMExtractionStrategy(
         llm_config=LLMConfig(provider=LLM_PROVIDER_STRING, api_token=TOGETHER_AI_API_KEY),
-        schema=DeconstructionResult.model_json_schema(),
+        schema=_DR_SCHEMA,
         instruction="Analyze the article content to identify bias and extract key factual claims according to the provided schema.",
         input_format="html",
         apply_chunking=True,
         chunk_token_threshold=8000
     )
     config = CrawlerRunConfig(extraction_strategy=extraction_strategy)
-    result = await crawler.arun(f"raw://{html_content}", config=config)
-    if result.success and result.extracted_content:
-        try:
-            data = json.loads(result.extracted_content)
-            if isinstance(data, list) and data:
-                consolidated_claims = []
-                bias_report = data[0].get('bias_report', "Bias analysis failed.")
-                for chunk_result in data: consolidated_claims.extend(chunk_result.get('claims', []))
-                return {"bias_report": bias_report, "claims": sorted(list(set(consolidated_claims)))}
-            elif isinstance(data, dict):
-                return {"bias_report": data.get("bias_report"), "claims": sorted(list(set(data.get("claims", []))))}
-        except (json.JSONDecodeError, TypeError):
-            return {"error": "Could not decode claims/bias object from LLM."}
-    return {"error": f"LLMExtractionStrategy failed. Details: {result.error_message}"}
+    # Exact match only: an updated page that merely embeds like its old version must be re-extracted
+    cache_key = f"dec:{hashlib.sha256(html_content.encode()).hexdigest()}"
+    extracted_content = (await redis_cache.get_many([cache_key]))[0]
+    from_cache = extracted_content is not None
+    if not from_cache:
+        result = await crawler.arun(f"raw://{html_content}", config=config)
+        if not (result.success and result.extracted_content):
+            return {"error": f"LLMExtractionStrategy failed. Details: {result.error_message}"}
+        extracted_content = result.extracted_content
+    try:
+        data = orjson.loads(extracted_content)
+        if isinstance(data, list) and data:
+            consolidated_claims = []
+            bias_report = data[0].get('bias_report', "Bias analysis failed.")
+            for chunk_result in data: consolidated_claims.extend(chunk_result.get('claims', []))
+            deconstruction = {"bias_report": bias_report, "claims": dedupe_claims(consolidated_claims)}
+        elif isinstance(data, dict):
+            deconstruction = {"bias_report": data.get("bias_report"), "claims": dedupe_claims(data.get("claims", []))}
+        else:
+            return {"error": "LLMExtractionStrategy returned an empty result."}
+    except (orjson.JSONDecodeError, TypeError):
+        return {"error": "Could not decode claims/bias object from LLM."}
+    if not from_cache: await redis_cache.set_many({cache_key: extracted_content}, DECONSTRUCT_CACHE_TTL)
+    return deconstruction
 
 ### PHASE 3: EVIDENCE GATHERING
 async def phase3_gather_evidence(crawler: AsyncWebCrawler, claims: list[str]):
     print(f"Phase 3: Gathering evidence for {len(claims)} claims...")
-    fact_check_task = batch_query_fact_checks(claims)
-    corroboration_task = batch_find_trusted_corroboration(crawler, claims)
-    fact_check_data, corroboration_data = await asyncio.gather(fact_check_task, corroboration_task)
-    return {"fact_checks": fact_check_data, "corroborations": corroboration_data}
+    async with asyncio.TaskGroup() as tg:
+        fact_check_task = tg.create_task(batch_query_fact_checks(claims))
+        corroboration_task = tg.create_task(batch_find_trusted_corroboration(crawler, claims))
+    return {"fact_checks": fact_check_task.result(), "corroborations": corroboration_task.result()}
 
 async def batch_query_fact_checks(claims: list[str]):
     print("-> Querying Google Fact Check API...")
-    results = {}
-    async with httpx.AsyncClient() as client:
-        tasks = [client.get(GOOGLE_FACT_CHECK_API_URL, params={"query": claim, "key": GOOGLE_API_KEY, "languageCode": "en"}) for claim in claims]
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-        for i, response in enumerate(responses):
-            claim = claims[i]
-            if isinstance(response, httpx.Response) and response.status_code == 200 and "claims" in response.json():
-                review = response.json()["claims"][0]["claimReview"][0]
+    cache_keys = {claim: claim_cache_key("fc", claim) for claim in claims}
+    cached = await redis_cache.get_many(list(cache_keys.values()))
+    results = {claim: hit for claim, hit in zip(cache_keys, cached) if hit is not None}
+    misses = [claim for claim in cache_keys if claim not in results]
+
+    # Shared by every query; the requests are multiplexed over the client's HTTP/2 connection
+    base_params = {"key": GOOGLE_API_KEY, "languageCode": "en"}
+
+    async def fetch(claim):
+        try: return await _client.get(GOOGLE_FACT_CHECK_API_URL, params={**base_params, "query": claim})
+        except Exception as e: return e
+
+    tasks = []
+    async with asyncio.TaskGroup() as tg:
+        for claim in misses:
+            # Backpressure: the next request is only created once one of the in-flight ones finishes
+            await _fact_check_slots.acquire()
+            task = tg.create_task(fetch(claim))
+            task.add_done_callback(lambda _: _fact_check_slots.release())
+            tasks.append(task)
+    responses = [task.result() for task in tasks]
+    fresh = {}
+    for claim, response in zip(misses, responses):
+        if isinstance(response, httpx.Response) and response.status_code == 200:
+            data = orjson.loads(response.content)
+            if "claims" in data:
+                review = data["claims"][0]["claimReview"][0]
                 results[claim] = f"RATING: {review.get('textualRating', 'N/A')} (Publisher: {review.get('publisher', {}).get('name', 'N/A')})"
             else: results[claim] = "No fact-check found."
+            fresh[cache_keys[claim]] = results[claim]
+        else: results[claim] = "No fact-check found."
+    await redis_cache.set_many(fresh, EVIDENCE_CACHE_TTL)
     return results
 
+# The Google result layout is fixed, so its selectors are compiled once instead of going through
+# JsonCssExtractionStrategy's CSS-schema translation on every page
+_SERP_RESULT = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' g ')]")
+_SERP_TITLE = etree.XPath("string(.//h3)")
+_SERP_LINK = etree.XPath("(.//a/@href)[1]")
+_SERP_SNIPPET = etree.XPath("string(.//div[@data-sncf='2'])")
+_SERP_CONFIG = CrawlerRunConfig(scraping_strategy=LXMLWebScrapingStrategy(), page_timeout=20000)
+
+def parse_serp(page_html: str, limit: int = 2) -> list[dict]:
+    """Title, link and snippet of the first `limit` results on a Google results page."""
+    corroborations = []
+    for result in _SERP_RESULT(lxml_html.fromstring(page_html)):
+        entry = {"title": _SERP_TITLE(result).strip(), "link": (_SERP_LINK(result) or [None])[0], "snippet": _SERP_SNIPPET(result).strip()}
+        corroborations.append({key: value for key, value in entry.items() if value})
+        if len(corroborations) == limit: break
+    return corroborations
+
 async def batch_find_trusted_corroboration(crawler: AsyncWebCrawler, claims: list[str]):
     print("-> Finding corroboration via targeted Google Search...")
-    trusted_domains = [domain for domain, tier in SOURCE_TIERS.items() if tier in [1, 2]]
-    search_urls = []
-    for claim in claims:
-        sites_query = ' OR '.join([f'site:{domain}' for domain in trusted_domains])
-        search_query = f'"{claim}" {sites_query}'
-        search_urls.append(f"https://www.google.com/search?q={urllib.parse.quote_plus(search_query)}")
-    
-    schema = {"name": "GoogleResults", "baseSelector": "div.g", "fields": [{"name": "title", "selector": "h3", "type": "text"}, {"name": "link", "selector": "a", "type": "attribute", "attribute": "href"}, {"name": "snippet", "selector": "div[data-sncf='2']", "type": "text"}]}
-    config = CrawlerRunConfig(extraction_strategy=JsonCssExtractionStrategy(schema), page_timeout=20000)
-    
-    results = await crawler.arun_many(urls=search_urls, config=config)
-    
-    final_corroborations = {}
-    for i, result in enumerate(results):
-        claim = claims[i]
-        if result.success and result.extracted_content:
+    cache_keys = {claim: f"{claim_cache_key('corr', claim)}:{_TRUSTED_DOMAINS_HASH}" for claim in claims}
+    cached = await redis_cache.get_many(list(cache_keys.values()))
+    final_corroborations = {claim: orjson.loads(hit) for claim, hit in zip(cache_keys, cached) if hit is not None}
+    misses = [claim for claim in cache_keys if claim not in final_corroborations]
+    if not misses: return final_corroborations
+
+    claim_by_url = {build_google_url(claim, _TRUSTED_SITES_Q_ENCODED): claim for claim in misses}
+    search_urls = list(claim_by_url)
+
+    # arun_many returns results in completion order, so each one is matched back to its claim by URL
+    results_by_claim = {}
+    for start in range(0, len(search_urls), MAX_INFLIGHT):
+        for result in await crawler.arun_many(urls=search_urls[start:start + MAX_INFLIGHT], config=_SERP_CONFIG):
+            if result.url in claim_by_url: results_by_claim[claim_by_url[result.url]] = result
+
+    fresh = {}
+    for claim in misses:
+        result = results_by_claim.get(claim)
+        if result is not None and result.success and result.html:
             try:
-                final_corroborations[claim] = json.loads(result.extracted_content)[:2]
-            except (json.JSONDecodeError, TypeError): final_corroborations[claim] = []
+                final_corroborations[claim] = parse_serp(result.html)
+                fresh[cache_keys[claim]] = orjson.dumps(final_corroborations[claim])
+            except etree.ParserError: final_corroborations[claim] = []
         else: final_corroborations[claim] = []
+    await redis_cache.set_many(fresh, EVIDENCE_CACHE_TTL)
     return final_corroborations
 
 ### PHASE 4: SYNTHESIS & SCORING (OpenAI version)
-async def call_llm_for_synthesis(api_key: str, prompt: str, is_json_output: bool = False):
+async def call_llm_for_synthesis(api_key: str, prompt: str, is_json_output: bool = False, max_tokens: int = 2048):
     # Commented out Together AI code
     # headers = {"Authorization": f"Bearer {api_key}"}
     # json_payload = {"model": LLM_PROVIDER_STRING, "messages": [{"role": "user", "content": prompt}], "temperature": 0.0, "max_tokens": 4096}
@@ -169,99 +279,217 @@ async def call_llm_for_synthesis(api_key: str, prompt: str, is_json_output: bool
             {"role": "user", "content": prompt}
         ],
         "temperature": 0.0,
-        "max_tokens": 2048
+        "max_tokens": max_tokens,
+        "stream": True
     }
     if is_json_output:
         payload["response_format"] = {"type": "json_object"}
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        try:
-            response = await client.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+    try:
+        parts = []
+        async with _client.stream("POST", "https://api.openai.com/v1/chat/completions", headers=headers, content=orjson.dumps(payload)) as response:
+            if response.is_error: await response.aread()  # so the error handler below can report the body
             response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except httpx.HTTPStatusError as e: return json.dumps({"error": f"OpenAI API Error: {e.response.status_code} - {e.response.text}"})
-        except Exception as e: return json.dumps({"error": f"An unexpected error occurred: {e}"})
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"): continue
+                data = line[5:].strip()
+                if data == "[DONE]": break
+                delta = orjson.loads(data)["choices"][0].get("delta", {}).get("content")
+                if not delta: continue
+                parts.append(delta)
+                # Stop reading as soon as the JSON object is complete; leaving the block resets the stream
+                if is_json_output and delta.rstrip().endswith("}"):
+                    try:
+                        orjson.loads("".join(parts))
+                        break
+                    except orjson.JSONDecodeError: pass
+        return "".join(parts)
+    except httpx.HTTPStatusError as e: return orjson.dumps({"error": f"OpenAI API Error: {e.response.status_code} - {e.response.text}"}).decode()
+    except Exception as e: return orjson.dumps({"error": f"An unexpected error occurred: {e}"}).decode()
 
-async def phase4_synthesize_and_score(claims: list[str], all_evidence: dict):
-    print(f"Phase 4: Synthesizing evidence (Model: {OPENAI_MODEL})...")
-    verdict_map = {"Well-Supported": 1.0, "Partially Supported": 0.75, "Lacks Evidence": 0.5, "Disputed": 0.25, "Actively Refuted": 0.0}
-    semaphore = asyncio.Semaphore(CONCURRENCY_LIMIT)
-
-    async def analyze_single_claim(claim):
-        async with semaphore:
-            fact_check_result = all_evidence["fact_checks"].get(claim, "N/A")
-            corroboration_results = all_evidence["corroborations"].get(claim, [])
-            prompt = f"""
-You are a meticulous fact-checking analyst. Analyze the claim against the provided evidence and produce a JSON object with your findings.
-**Claim to Verify:** "{claim}"
-**Evidence Provided:**
-1. **Fact-Check Database Result:** "{fact_check_result}"
-2. **Corroborating Search Results from Trusted Sources:** {json.dumps(corroboration_results)}
-**Your Task:**
-Produce a JSON object with the exact following structure:
-{{
-  "claim": "{claim}",
+VERDICT_MAP = {"Well-Supported": 1.0, "Partially Supported": 0.75, "Lacks Evidence": 0.5, "Disputed": 0.25, "Actively Refuted": 0.0}
+# Finds the verdict inside decorated answers ("[Disputed]", "well-supported.", "Verdict: Lacks Evidence")
+_VERDICT_RE = re.compile('|'.join(re.escape(verdict) for verdict in VERDICT_MAP), re.IGNORECASE)
+_VERDICT_BY_LOWER = {verdict.lower(): verdict for verdict in VERDICT_MAP}
+
+def normalize_verdict(verdict) -> str:
+    """Maps the model's verdict onto its VERDICT_MAP spelling; unrecognized answers are returned unchanged."""
+    match = _VERDICT_RE.search(str(verdict))
+    return _VERDICT_BY_LOWER[match.group(0).lower()] if match else verdict
+# Claims are verified together in one request per batch. A batch stays under ~12k prompt tokens
+# (estimated at 4 characters per token) and few enough claims that every verdict fits in max_tokens.
+SYNTHESIS_BATCH_CHARS = 48000
+SYNTHESIS_BATCH_CLAIMS = 8
+# One result object (claim, one-sentence summary, 1-2 sentence rationale, verdict) stays well under this
+SYNTHESIS_TOKENS_PER_CLAIM = 250
+SYNTHESIS_BATCH_PROMPT = """You are a meticulous fact-checking analyst. Each object in CLAIMS below holds an id, a claim and the evidence gathered for it:
+"fact_check" is the Fact-Check Database Result and "corroboration" the Corroborating Search Results from Trusted Sources.
+Analyze every claim against its own evidence only, and produce a JSON object {"results": [...]} with exactly one entry per claim, in the same order, each with the exact following structure:
+{
+  "id": "The claim's id, copied from its CLAIMS object.",
+  "claim": "The claim, copied verbatim.",
   "evidence_summary": "A brief, one-sentence summary of what the combined evidence indicates.",
   "rationale": "A 1-2 sentence explanation of your reasoning. Explicitly state how the evidence supports or refutes the claim.",
   "verdict": "Your final verdict. Must be one of: 'Well-Supported', 'Partially Supported', 'Lacks Evidence', 'Disputed', or 'Actively Refuted'."
-}}
+}
+CLAIMS:
 """
-            response_json_str = await call_llm_for_synthesis(OPENAI_API_KEY, prompt, is_json_output=True)
-            try:
-                analysis_result = json.loads(response_json_str)
-                analysis_result["evidence_snippets"] = corroboration_results
-                return analysis_result
-            except (json.JSONDecodeError, TypeError): return {"claim": claim, "rationale": "LLM failed to return valid JSON.", "verdict": "Error", "evidence_snippets": corroboration_results}
-            finally: await asyncio.sleep(1)
-
-    tasks = [analyze_single_claim(claim) for claim in claims]
-    analysis_results = await asyncio.gather(*tasks)
-    claim_scores = [verdict_map.get(res.get('verdict'), 0.0) for res in analysis_results]
+
+def pack_synthesis_batches(items: list[dict]):
+    """Greedily groups consecutive claim/evidence objects into batches within the size and count limits."""
+    batches, current, size = [], [], 0
+    for item in items:
+        item_size = len(orjson.dumps(item))
+        if current and (size + item_size > SYNTHESIS_BATCH_CHARS or len(current) == SYNTHESIS_BATCH_CLAIMS):
+            batches.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current: batches.append(current)
+    return batches
+
+def match_synthesis_results(batch: list[dict], results) -> Optional[dict]:
+    """
+    Maps each batch claim to its answer by the id the model echoes back. Returns None (the whole
+    batch failed) unless there is exactly one answer per id, so a dropped, merged or reordered
+    item can never hand one claim's verdict to another.
+    """
+    if not isinstance(results, list) or len(results) != len(batch): return None
+    # Ids are compared as strings, since the model may echo 3 as "3"
+    by_id = {str(result.get("id")): result for result in results if isinstance(result, dict)}
+    if set(by_id) != {str(item["id"]) for item in batch}: return None
+    return {item["claim"]: by_id[str(item["id"])] for item in batch}
+
+async def phase4_synthesize_and_score(claims: list[str], all_evidence: dict):
+    print(f"Phase 4: Synthesizing evidence (Model: {OPENAI_MODEL})...")
+    evidence = {}
+    for claim in claims:
+        fact_check_result = all_evidence["fact_checks"].get(claim, "N/A")
+        corroboration_results = all_evidence["corroborations"].get(claim, [])
+        corroboration_titles = sorted(str(c.get('title', '')) for c in corroboration_results)
+        evidence_key = f"{claim}|{fact_check_result}|{orjson.dumps(corroboration_titles).decode()}"
+        # A reworded claim reuses an earlier verdict only if its evidence (fact-check result and
+        # corroborating links) is exactly the same, so similar wording can't borrow another claim's verdict
+        evidence_context = f"{fact_check_result}|{orjson.dumps(sorted(str(c.get('link', '')) for c in corroboration_results)).decode()}"
+        evidence[claim] = (fact_check_result, corroboration_results, f"syn:{hashlib.sha256(evidence_key.encode()).hexdigest()}", evidence_context)
+
+    verdicts = {}
+    cached = await redis_cache.get_many([evidence[claim][2] for claim in claims])
+    for claim, hit in zip(claims, cached):
+        if hit: verdicts[claim] = orjson.loads(hit)
+    for claim in claims:
+        if claim in verdicts: continue
+        hit = await semantic_cache.lookup("synthesis", claim, evidence[claim][3])
+        if hit: verdicts[claim] = {**orjson.loads(hit), "claim": claim}
+
+    async def synthesize_batch(batch: list[dict]):
+        prompt = SYNTHESIS_BATCH_PROMPT + orjson.dumps(batch).decode()
+        async with _openai_limiter:
+            response_json_str = await call_llm_for_synthesis(OPENAI_API_KEY, prompt, is_json_output=True, max_tokens=SYNTHESIS_TOKENS_PER_CLAIM * len(batch))
+        try: results = orjson.loads(response_json_str).get("results")
+        except (orjson.JSONDecodeError, AttributeError): results = None
+        matched = match_synthesis_results(batch, results)
+        if matched is None: return  # Nothing is cached, so these claims are retried next run
+        fresh = {}
+        for claim, result in matched.items():
+            result.pop("id", None)
+            result["claim"] = claim
+            result["verdict"] = normalize_verdict(result.get("verdict"))
+            verdicts[claim] = result
+            if result["verdict"] in VERDICT_MAP:
+                result_json = orjson.dumps(result)
+                fresh[evidence[claim][2]] = result_json
+                await semantic_cache.store("synthesis", claim, result_json.decode(), evidence[claim][3])
+        await redis_cache.set_many(fresh, SYNTHESIS_CACHE_TTL)
+
+    unverified = [claim for claim in claims if claim not in verdicts]
+    pending = [{"id": i, "claim": claim, "fact_check": evidence[claim][0], "corroboration": evidence[claim][1]} for i, claim in enumerate(unverified)]
+    if pending:
+        async with asyncio.TaskGroup() as tg:
+            for batch in pack_synthesis_batches(pending): tg.create_task(synthesize_batch(batch))
+
+    analysis_results = []
+    for claim in claims:
+        result = verdicts.get(claim) or {"claim": claim, "rationale": "LLM failed to return valid JSON.", "verdict": "Error"}
+        result["evidence_snippets"] = evidence[claim][1]
+        analysis_results.append(result)
+    claim_scores = [VERDICT_MAP.get(res.get('verdict'), 0.0) for res in analysis_results]
+    return analysis_results, claim_scores
+
+async def verify_claims(crawler: AsyncWebCrawler, claims: list[str]):
+    """
+    Phases 3 and 4 pipelined per synthesis batch: a batch is sent for synthesis as soon as its own
+    evidence is in, while later batches are still being searched.
+    """
+    # Groups gathering evidence at once, keeping the total of open SERP pages within MAX_INFLIGHT
+    evidence_slots = asyncio.Semaphore(max(1, MAX_INFLIGHT // SYNTHESIS_BATCH_CLAIMS))
+
+    async def verify(group: list[str]):
+        async with evidence_slots:
+            evidence = await phase3_gather_evidence(crawler, group)
+        return await phase4_synthesize_and_score(group, evidence)
+
+    groups = [claims[start:start + SYNTHESIS_BATCH_CLAIMS] for start in range(0, len(claims), SYNTHESIS_BATCH_CLAIMS)]
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(verify(group)) for group in groups]
+    results = [task.result() for task in tasks]
+    analysis_results = [analysis for group_results, _ in results for analysis in group_results]
+    claim_scores = [score for _, group_scores in results for score in group_scores]
     return analysis_results, claim_scores
 
+_TIER_SCORE_MAP = {1: 100, 2: 90, 3: 75, 4: 40, 5: 10, "satire": 0}
+_BIAS_RE = re.compile(r'Bias rating:\s*(\d)', re.IGNORECASE)
+
 def calculate_final_score(source_tier: int, bias_report: str, claim_scores: list[float]):
-    tier_score_map = {1: 100, 2: 90, 3: 75, 4: 40, 5: 10, "satire": 0}
-    source_score = tier_score_map.get(source_tier, 60)
+    source_score = _TIER_SCORE_MAP.get(source_tier, 60)
     evidence_score = (sum(claim_scores) / len(claim_scores) * 100) if claim_scores else 0
-    bias_rating_match = re.search(r'Bias rating:\s*(\d)', bias_report, re.IGNORECASE)
+    bias_rating_match = _BIAS_RE.search(bias_report)
     bias_rating = int(bias_rating_match.group(1)) if bias_rating_match else 3
     bias_score = max(0, 100 - (bias_rating - 1) * 25)
     final_score = (source_score * 0.30) + (evidence_score * 0.50) + (bias_score * 0.20)
     return {"final_score": round(final_score, 2), "components": {"Source": source_score, "Evidence": round(evidence_score, 2), "Bias": bias_score}}
 
 ### MAIN WORKFLOW ORCHESTRATOR
-async def analyze_article(user_input: str):
-    browser_config = BrowserConfig(headless=True, verbose=False)
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        if user_input.strip().startswith('http'):
-            ingestion_result = await phase1_ingest_content(crawler, user_input)
-            if ingestion_result["error"]: print(f"ANALYSIS FAILED in Phase 1: {ingestion_result['error']}"); return
-        else:
-            print("Phase 1: Bypassed. Using raw text input.")
-            ingestion_result = {"tier": 3, "html_content": user_input, "error": None}
+async def analyze_article(user_input: str, crawler: Optional[AsyncWebCrawler] = None):
+    """
+    Runs the full pipeline and returns the report, or raises RuntimeError if Phase 1 or 2 fails.
+    Callers that keep a warm crawler (the worker does) pass it in to skip the browser
+    launch; otherwise one is started just for this analysis.
+    """
+    if crawler is not None:
+        return await run_pipeline(crawler, user_input)
+    async with AsyncWebCrawler(config=BROWSER_CONFIG) as crawler:
+        return await run_pipeline(crawler, user_input)
 
-        deconstruction_result = await phase2_deconstruct_article(crawler, ingestion_result["html_content"])
-        if "error" in deconstruction_result: print(f"ANALYSIS FAILED in Phase 2: {deconstruction_result['error']}"); return
-        
-        claims = deconstruction_result["claims"]
-        if not claims: print("ANALYSIS CONCLUDED: No factual claims were extracted for verification."); return
+async def run_pipeline(crawler: AsyncWebCrawler, user_input: str):
+    if user_input.strip().startswith('http'):
+        ingestion_result = await phase1_ingest_content(crawler, user_input)
+        if ingestion_result["error"]: raise RuntimeError(f"ANALYSIS FAILED in Phase 1: {ingestion_result['error']}")
+    else:
+        print("Phase 1: Bypassed. Using raw text input.")
+        ingestion_result = {"tier": 3, "html_content": user_input, "error": None}
 
-        all_evidence = await phase3_gather_evidence(crawler, claims)
-        final_analysis, claim_scores = await phase4_synthesize_and_score(claims, all_evidence)
-        final_score_data = calculate_final_score(ingestion_result["tier"], deconstruction_result["bias_report"], claim_scores)
-        
-        final_report = {
-            "final_credibility_score": final_score_data["final_score"],
-            "score_components": final_score_data["components"],
-            "publisher_tier": ingestion_result["tier"],
-            "bias_report": deconstruction_result["bias_report"],
-            "claim_verifications": final_analysis
-        }
+    deconstruction_result = await phase2_deconstruct_article(crawler, ingestion_result["html_content"])
+    if "error" in deconstruction_result: raise RuntimeError(f"ANALYSIS FAILED in Phase 2: {deconstruction_result['error']}")
+    
+    # An article with no checkable claims is still a completed analysis, with an empty claim list (and Evidence at 0)
+    claims = deconstruction_result["claims"]
+    final_analysis, claim_scores = await verify_claims(crawler, claims) if claims else ([], [])
+    final_score_data = calculate_final_score(ingestion_result["tier"], deconstruction_result["bias_report"], claim_scores)
+    
+    final_report = {
+        "final_credibility_score": final_score_data["final_score"],
+        "score_components": final_score_data["components"],
+        "publisher_tier": ingestion_result["tier"],
+        "bias_report": deconstruction_result["bias_report"],
+        "claim_verifications": final_analysis
+    }
+    print("--- Analysis Complete ---")
+    return final_report
 
-        print("\n\n--- FINAL ANALYSIS REPORT ---")
-        print("="*60)
-        print(json.dumps(final_report, indent=2))
-        print("\n" + "="*60)
-        print("--- Analysis Complete ---")
+async def main(user_input: str):
+    """Command-line entry point: one analysis, then the shared HTTP client is closed (the worker closes it on shutdown instead)."""
+    try: return await analyze_article(user_input)
+    finally: await close_http_client()
 
 if __name__ == "__main__":
     if not all([TOGETHER_AI_API_KEY, GOOGLE_API_KEY, OPENAI_API_KEY]):
@@ -269,7 +497,7 @@ if __name__ == "__main__":
     # else:
     #     # --- Option 1: Analyze a news article from a URL ---
     #     url_to_analyze = "https://timesofindia.indiatimes.com/technology/top-10-useful-gadgets-for-home-use/articleshow/121653588.cms"
-    #     asyncio.run(analyze_article(user_input=url_to_analyze))
+    #     run(main(url_to_analyze))
 
     
     else:
@@ -279,8 +507,8 @@ X, the social media company formerly known as Twitter, has confirmed it will beg
 According to a statement on the company's website, new users in these regions will be required to pay the fee to perform actions such as posting content, liking, replying, and bookmarking. Existing users are not affected by this change. Company owner Elon Musk stated on the platform that the move is intended to combat spam and the significant presence of bot activity, calling it the only way to fight automated accounts at scale..
 """
         
-        report = asyncio.run(analyze_article(user_input=input_data))
+        report = run(main(input_data))
         print("\n\n--- FINAL ANALYSIS REPORT ---")
         print("="*60)
-        print(json.dumps(report, indent=2))
+        print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
         print("\n" + "="*60)
\ No newline at end of file
@@ -0,0 +1,45 @@
+# filename: llm_cache.py
+
+import hashlib
+import orjson
+import os
+import sqlite3
+import time
+from typing import Optional
+
+# LLM calls run at temperature 0.0, so identical requests give identical answers.
+# Responses are memoized in-process and persisted to a small SQLite file so re-runs
+# of the scripts skip the Together AI round-trip (and its token cost) entirely.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "_llm_cache.sqlite")
+LLM_CACHE_TTL_SECONDS = 7 * 86400
+
+_memory: dict[str, str] = {}
+_db: Optional[sqlite3.Connection] = None
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(LLM_CACHE_PATH)
+        # WAL lets several scripts / processes read the cache while one of them writes
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, ts INTEGER)")
+    return _db
+
+def make_key(model: str, messages: list[dict], is_json_output: bool) -> str:
+    return hashlib.sha256(orjson.dumps({"m": model, "p": messages, "j": is_json_output}, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Returns the stored response for `key`, checking memory first, then SQLite (ignoring expired rows)."""
+    if key in _memory:
+        return _memory[key]
+    row = _connect().execute("SELECT value, ts FROM llm_cache WHERE key = ?", (key,)).fetchone()
+    if row and time.time() - row[1] < LLM_CACHE_TTL_SECONDS:
+        _memory[key] = row[0]
+        return row[0]
+    return None
+
+def store_response(key: str, value: str):
+    _memory[key] = value
+    db = _connect()
+    db.execute("INSERT OR REPLACE INTO llm_cache (key, value, ts) VALUES (?, ?, ?)", (key, value, int(time.time())))
+    db.commit()
@@ -1,30 +1,25 @@
 # filename: main.py
 
-import asyncio
 from source_tiering import get_source_tier
-from crawl4ai import (
-    AsyncWebCrawler,
-    CrawlerRunConfig
-)
-from crawl4ai.content_filter_strategy import PruningContentFilter
-from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from pipeline_utils import load_crawl4ai, crawl_verbose, crawl_cache_mode, run
 
 async def process_input(input_content: str):
     """
     This single function processes content from either a URL or raw HTML string
     by leveraging Crawl4AI's prefix handling.
     """
+    crawl4ai = load_crawl4ai()
     # Configure a markdown generator with a pruning filter to get the core article text[cite: 271, 337].
     # This filter removes boilerplate like ads, sidebars, and footers[cite: 272].
-    md_generator = DefaultMarkdownGenerator(
-        content_filter=PruningContentFilter(threshold=0.5)
+    md_generator = crawl4ai.DefaultMarkdownGenerator(
+        content_filter=crawl4ai.PruningContentFilter(threshold=0.5)
     )
-    config = CrawlerRunConfig(markdown_generator=md_generator)
+    config = crawl4ai.CrawlerRunConfig(markdown_generator=md_generator, cache_mode=crawl_cache_mode())
 
     # Determine the source URL for tiering.
     source_url = input_content if input_content.startswith('http') else 'raw_text_input'
     
-    async with AsyncWebCrawler() as crawler:
+    async with crawl4ai.AsyncWebCrawler(verbose=crawl_verbose()) as crawler:
         # The arun method handles the full crawling and extraction process[cite: 559].
         result = await crawler.arun(input_content, config=config)
 
@@ -73,7 +68,7 @@ if __name__ == "__main__":
 
     # Example 1: Analyze an article from a URL
     url_to_check = "https://www.npr.org/2024/08/28/g-s1-19832/workers-killed-injured-delta-air-lines-atlanta"
-    asyncio.run(analyze_article(url_to_check))
+    run(analyze_article(url_to_check))
 
     # Example 2: Analyze an article from a raw HTML string
     # raw_html_content = """
@@ -90,4 +85,4 @@ if __name__ == "__main__":
     #   </body>
     # </html>
     # """
-    # asyncio.run(analyze_article(raw_html_content))
\ No newline at end of file
+    # run(analyze_article(raw_html_content))
\ No newline at end of file
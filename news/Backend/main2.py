@@ -1,18 +1,14 @@
 # filename: main.py
 
-import asyncio
 import os
-import json
+import orjson
 import httpx
+from typing import Optional
 from dotenv import load_dotenv
 
 from source_tiering import get_source_tier
-from crawl4ai import (
-    AsyncWebCrawler,
-    CrawlerRunConfig
-)
-from crawl4ai.content_filter_strategy import PruningContentFilter
-from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from pipeline_utils import load_crawl4ai, crawl_verbose, crawl_cache_mode, run
+import llm_cache
 
 # --- NEW: Load environment variables from .env file ---
 load_dotenv()
@@ -22,19 +18,62 @@ load_dotenv()
 TOGETHER_AI_MODEL = "meta-llama/Llama-3-70b-chat-hf"
 TOGETHER_AI_API_URL = "https://api.together.xyz/v1/chat/completions"
 
+# Static instructions go in the system message and the article in the user message, so every
+# request shares an identical prefix that the provider's prompt cache can reuse.
+# Claim extraction and bias analysis are answered by one JSON response instead of two calls.
+ANALYSIS_SYSTEM_PROMPT = """You will be given a news article. Perform two tasks and answer with a single JSON object.
+
+1. Claims: Identify and list every distinct factual claim that can be independently verified. Ignore opinions, predictions, and subjective statements.
+2. Bias: Analyze the tone, sentiment, and rhetorical devices in this article. Is the framing neutral, or does it use loaded language, logical fallacies, or emotional appeals to persuade the reader? Identify specific examples. Conclude with a bias rating from 1 (Neutral) to 5 (Highly Biased).
+
+Respond with exactly this structure:
+{"claims": ["<claim>", ...], "bias": {"analysis": "<analysis with examples>", "rating": <1-5>}}"""
+
+# Guided decoding: Together constrains generation to this schema, so the JSON answer always parses
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "claims": {"type": "array", "items": {"type": "string"}},
+        "bias": {
+            "type": "object",
+            "properties": {"analysis": {"type": "string"}, "rating": {"type": "integer", "minimum": 1, "maximum": 5}},
+            "required": ["analysis", "rating"]
+        }
+    },
+    "required": ["claims", "bias"]
+}
+
+# --- Shared HTTP client ---
+# Created on first use and reused for every Together AI / Google request, so calls share
+# pooled (HTTP/2) connections instead of paying a fresh TLS handshake each time.
+_HTTP: Optional[httpx.AsyncClient] = None
+
+def get_http() -> httpx.AsyncClient:
+    global _HTTP
+    if _HTTP is None:
+        _HTTP = httpx.AsyncClient(http2=True, timeout=httpx.Timeout(60.0), limits=httpx.Limits(max_connections=50, max_keepalive_connections=20))
+    return _HTTP
+
+async def close_http():
+    global _HTTP
+    if _HTTP is not None:
+        await _HTTP.aclose()
+        _HTTP = None
+
 
 async def process_input(input_content: str):
     """
     This single function processes content from either a URL or raw HTML string
     [cite_start]by leveraging Crawl4AI's prefix handling. [cite: 749, 755]
     """
-    md_generator = DefaultMarkdownGenerator(
-        content_filter=PruningContentFilter(threshold=0.5) # Using PruningContentFilter for a clean core text. [cite: 538, 539, 608, 838, 1080]
+    crawl4ai = load_crawl4ai()
+    md_generator = crawl4ai.DefaultMarkdownGenerator(
+        content_filter=crawl4ai.PruningContentFilter(threshold=0.5) # Using PruningContentFilter for a clean core text. [cite: 538, 539, 608, 838, 1080]
     )
-    config = CrawlerRunConfig(markdown_generator=md_generator)
+    config = crawl4ai.CrawlerRunConfig(markdown_generator=md_generator, cache_mode=crawl_cache_mode())
     source_url = input_content if input_content.startswith('http') else 'raw_text_input'
     
-    async with AsyncWebCrawler() as crawler:
+    async with crawl4ai.AsyncWebCrawler(verbose=crawl_verbose()) as crawler:
         result = await crawler.arun(input_content, config=config)
 
     if result.success and result.markdown:
@@ -46,10 +85,17 @@ async def process_input(input_content: str):
         return {"error": result.error_message, "tier": None, "text": None}
 
 # --- NEW: Function to call the LLM Provider ---
-async def call_llm(api_key: str, prompt: str, is_json_output: bool = False):
+async def call_llm(api_key: str, system: str, user: str, is_json_output: bool = False):
     """
     A reusable function to make API calls to the Together AI endpoint.
+    Successful responses are cached, since temperature 0.0 makes them deterministic.
     """
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    cache_key = llm_cache.make_key(TOGETHER_AI_MODEL, messages, is_json_output)
+    cached = llm_cache.get_cached_response(cache_key)
+    if cached is not None:
+        return cached
+
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
@@ -57,29 +103,37 @@ async def call_llm(api_key: str, prompt: str, is_json_output: bool = False):
     
     json_payload = {
         "model": TOGETHER_AI_MODEL,
-        "messages": [{"role": "user", "content": prompt}],
+        "messages": messages,
         "temperature": 0.0,
         "top_p": 0.7,
         "max_tokens": 2048
     }
     
     if is_json_output:
-        json_payload["response_format"] = {"type": "json_object"}
-
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            response = await client.post(TOGETHER_AI_API_URL, headers=headers, json=json_payload)
-            response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-            return response.json()["choices"][0]["message"]["content"]
-        except httpx.HTTPStatusError as e:
-            return f"LLM API Error: {e.response.status_code} - {e.response.text}"
-        except Exception as e:
-            return f"An unexpected error occurred during LLM call: {str(e)}"
+        json_payload["response_format"] = {"type": "json_schema", "schema": ANALYSIS_SCHEMA}
+
+    try:
+        response = await get_http().post(TOGETHER_AI_API_URL, headers=headers, content=orjson.dumps(json_payload))
+        response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        content = orjson.loads(response.content)["choices"][0]["message"]["content"]
+        llm_cache.store_response(cache_key, content)
+        return content
+    except httpx.HTTPStatusError as e:
+        return f"LLM API Error: {e.response.status_code} - {e.response.text}"
+    except Exception as e:
+        return f"An unexpected error occurred during LLM call: {str(e)}"
+
+# Prefill cost grows with input length; ~12k characters (~3k tokens) covers the body of a typical news article
+MAX_ARTICLE_CHARS = 12000
+
+def clip(text: str, max_chars: int = MAX_ARTICLE_CHARS) -> str:
+    """Caps the article sent to the LLM, marking where it was cut."""
+    return text if len(text) <= max_chars else text[:max_chars] + "\n\n[TRUNCATED]"
 
 # --- NEW: Function for Claim and Bias Extraction ---
 async def extract_claims_and_bias(article_text: str):
     """
-    Orchestrates the two required LLM calls for claim extraction and bias analysis.
+    Runs claim extraction and bias analysis as a single LLM call and splits the JSON answer.
     """
     api_key = os.getenv("TOGETHER_AI_API_KEY")
     if not api_key:
@@ -88,36 +142,20 @@ async def extract_claims_and_bias(article_text: str):
             "bias_report": "ERROR: API key not found."
         }
         
-    # 1. Instruction-Based Claim Extraction
-    claim_prompt = f"""Analyze the following news article. Identify and list every distinct factual claim that can be independently verified. Ignore opinions, predictions, and subjective statements. Present the output as a JSON object with a single key "claims" which holds an array of strings.
-
-    Article:
-    {article_text}
-    """
+    response = await call_llm(api_key, ANALYSIS_SYSTEM_PROMPT, f"Article:\n{clip(article_text)}", is_json_output=True)
     
-    # 2. Bias and Framing Analysis
-    bias_prompt = f"""Analyze the tone, sentiment, and rhetorical devices in this article. Is the framing neutral, or does it use loaded language, logical fallacies, or emotional appeals to persuade the reader? Identify specific examples. Conclude with a bias rating from 1 (Neutral) to 5 (Highly Biased).
-
-    Article:
-    {article_text}
-    """
-
-    # Run both API calls concurrently
-    claims_task = call_llm(api_key, claim_prompt, is_json_output=True)
-    bias_task = call_llm(api_key, bias_prompt)
-    
-    results = await asyncio.gather(claims_task, bias_task)
-    
-    # Parse results with error handling
+    # Output is schema-constrained, so a parse failure can only mean call_llm returned an error message
     try:
-        claims_data = json.loads(results[0])
-    except (json.JSONDecodeError, TypeError):
-        claims_data = {"claims": ["LLM did not return valid JSON for claims.", f"Raw response: {results[0]}"]}
-        
-    bias_data = results[1]
+        data = orjson.loads(response)
+    except (orjson.JSONDecodeError, TypeError):
+        data = {"claims": [f"ERROR: {response}"], "bias": response}
+
+    bias_data = data.get("bias", "")
+    if isinstance(bias_data, dict):
+        bias_data = f"{bias_data.get('analysis', '')}\n\nBias Rating: {bias_data.get('rating', 'N/A')}/5"
 
     return {
-        "claims": claims_data.get("claims", []),
+        "claims": data.get("claims", []),
         "bias_report": bias_data
     }
 
@@ -167,12 +205,19 @@ async def analyze_article(user_input: str):
     print("\n--- Analysis Complete ---")
 
 
+async def main(user_input: str):
+    try:
+        await analyze_article(user_input)
+    finally:
+        await close_http()
+
+
 if __name__ == "__main__":
     # --- CHOOSE ONE EXAMPLE TO RUN ---
 
     # Example 1: Analyze an article from a URL
     url_to_check = "https://www.npr.org/2024/08/28/g-s1-19832/workers-killed-injured-delta-air-lines-atlanta"
-    asyncio.run(analyze_article(url_to_check))
+    run(main(url_to_check))
 
     # Example 2: Analyze an article from a raw HTML string
     # raw_html_content = """
@@ -181,4 +226,4 @@ if __name__ == "__main__":
     # <p>In a landmark study published today by the Institute of Fictional Science, researchers found that using advanced "Quantum Widgets" in the workplace led to a threefold increase in overall employee efficiency. Dr. Evelyn Reed, the lead author, stated, "The data is undeniable; these widgets have revolutionized productivity." The study involved 10,000 participants over a two-year period, making it the largest of its kind.</p>
     # </main></body></html>
     # """
-    # asyncio.run(analyze_article(raw_html_content))
\ No newline at end of file
+    # run(main(raw_html_content))
\ No newline at end of file
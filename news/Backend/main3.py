@@ -1,21 +1,26 @@
 # filename: main.py
 
+from __future__ import annotations
+
 import asyncio
+import io
 import os
+import sys
 import json
+import orjson
+import re
+import sqlite3
+import time
+import hashlib
 import httpx
+from typing import Optional, TYPE_CHECKING
 from dotenv import load_dotenv
-import urllib.parse
-
-# We now import SOURCE_TIERS to use for building our trusted search query
-from source_tiering import get_source_tier, SOURCE_TIERS
-from crawl4ai import (
-    AsyncWebCrawler,
-    CrawlerRunConfig,
-    JsonCssExtractionStrategy # This will be used to parse Google Search results
-)
-from crawl4ai.content_filter_strategy import PruningContentFilter
-from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+# We now import the tier index to use for building our trusted search query
+from source_tiering import get_source_tier
+from pipeline_utils import normalize_claim, dedupe_claims, retry_delay, build_google_url, TRUSTED_SITES_Q, load_crawl4ai, crawl_verbose, crawl_cache_mode, run
+if TYPE_CHECKING: from crawl4ai import AsyncWebCrawler
+import llm_cache
 
 # Load credentials from .env file
 load_dotenv()
@@ -24,96 +29,285 @@ load_dotenv()
 TOGETHER_AI_MODEL = "meta-llama/Llama-3-70b-chat-hf"
 TOGETHER_AI_API_URL = "https://api.together.xyz/v1/chat/completions"
 GOOGLE_FACT_CHECK_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
+# Simultaneous Together AI requests; past this the API starts answering 429
+TOGETHER_CONCURRENCY = 8
+# Cap on simultaneous Fact Check API requests, to stay inside Google's rate limits
+FACT_CHECK_CONCURRENCY = 10
+# Programmable Search (JSON API) replaces the browser-rendered Google SERP when GOOGLE_CSE_ID is set
+GOOGLE_CSE_API_URL = "https://www.googleapis.com/customsearch/v1"
+SEARCH_CONCURRENCY = 10
+# Browser pages rendered at once for the SERP fallback
+CRAWL_CONCURRENCY = 4
+# Rate-limit and transient server errors are retried with exponential backoff
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+
+# Static instructions first (system), article last (user): keeps a shared, cacheable prompt prefix.
+# Claims and bias come back in one JSON object, so Phase 2 is a single round trip.
+ANALYSIS_SYSTEM_PROMPT = """You will be given a news article. 1) Identify and list every distinct factual claim... 2) Analyze the tone, sentiment, and rhetorical devices... bias rating from 1 (Neutral) to 5 (Highly Biased)...
+Respond with a single JSON object: {"claims": ["<claim>", ...], "bias": {"analysis": "<analysis>", "rating": <1-5>}}"""
+
+# Guided decoding: Together constrains generation to this schema, so the JSON answer always parses
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "claims": {"type": "array", "items": {"type": "string"}},
+        "bias": {
+            "type": "object",
+            "properties": {"analysis": {"type": "string"}, "rating": {"type": "integer", "minimum": 1, "maximum": 5}},
+            "required": ["analysis", "rating"]
+        }
+    },
+    "required": ["claims", "bias"]
+}
+
+# A persistent profile keeps cookies and Chromium's HTTP/JS caches between runs; text_mode skips
+# images and light_mode turns off background browser features we don't need for news text.
+def browser_config():
+    return load_crawl4ai().BrowserConfig(
+        headless=True,
+        verbose=crawl_verbose(),
+        use_persistent_context=True,
+        user_data_dir=os.getenv("CRAWL4AI_PROFILE_DIR", ".crawl4ai_profile"),
+        text_mode=True,
+        light_mode=True
+    )
+
+# --- Shared HTTP client ---
+# Created on first use and reused for every Together AI / Google request, so calls share
+# pooled (HTTP/2) connections instead of paying a fresh TLS handshake each time.
+_HTTP: Optional[httpx.AsyncClient] = None
 
+def get_http() -> httpx.AsyncClient:
+    global _HTTP
+    if _HTTP is None:
+        _HTTP = httpx.AsyncClient(http2=True, timeout=httpx.Timeout(90.0), limits=httpx.Limits(max_connections=50, max_keepalive_connections=20))
+    return _HTTP
+
+async def close_http():
+    global _HTTP
+    if _HTTP is not None:
+        await _HTTP.aclose()
+        _HTTP = None
+
+async def get_with_retry(semaphore: asyncio.Semaphore, url: str, **kwargs) -> httpx.Response:
+    """GETs `url` holding `semaphore`, retrying 429/5xx answers. Backoff sleeps happen outside the semaphore."""
+    for attempt in range(MAX_RETRIES + 1):
+        async with semaphore:
+            response = await get_http().get(url, **kwargs)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES: return response
+        await asyncio.sleep(retry_delay(response, attempt))
 
 # --- Phase 1 & 2 Functions (Unchanged) ---
-async def process_input(input_content: str):
-    md_generator = DefaultMarkdownGenerator(content_filter=PruningContentFilter(threshold=0.5))
-    config = CrawlerRunConfig(markdown_generator=md_generator)
+async def process_input(crawler: AsyncWebCrawler, input_content: str):
+    crawl4ai = load_crawl4ai()
+    md_generator = crawl4ai.DefaultMarkdownGenerator(content_filter=crawl4ai.PruningContentFilter(threshold=0.5))
+    config = crawl4ai.CrawlerRunConfig(markdown_generator=md_generator, cache_mode=crawl_cache_mode())
     source_url = input_content if input_content.startswith('http') else 'raw_text_input'
-    async with AsyncWebCrawler(verbose=False) as crawler: # Verbose off for cleaner output
-        result = await crawler.arun(input_content, config=config)
+    result = await crawler.arun(input_content, config=config)
     if result.success and result.markdown:
         tier = get_source_tier(source_url)
         core_text = result.markdown.fit_markdown 
         return {"tier": tier, "text": core_text, "error": None}
     return {"error": result.error_message, "tier": None, "text": None}
 
-async def call_llm(api_key: str, prompt: str, is_json_output: bool = False):
+_TOGETHER_SEMAPHORE = asyncio.Semaphore(TOGETHER_CONCURRENCY)
+
+async def stream_llm(api_key: str, system: str, user: str, is_json_output: bool = False):
+    """Yields the response text as Together streams it (SSE). A cache hit is yielded as one chunk."""
+    # temperature 0.0 makes responses deterministic, so repeat prompts are served from cache
+    messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+    cache_key = llm_cache.make_key(TOGETHER_AI_MODEL, messages, is_json_output)
+    cached = llm_cache.get_cached_response(cache_key)
+    if cached is not None:
+        yield cached
+        return
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    json_payload = {"model": TOGETHER_AI_MODEL, "messages": [{"role": "user", "content": prompt}], "temperature": 0.0, "max_tokens": 2048}
-    if is_json_output: json_payload["response_format"] = {"type": "json_object"}
-    async with httpx.AsyncClient(timeout=90.0) as client:
-        try:
-            response = await client.post(TOGETHER_AI_API_URL, headers=headers, json=json_payload)
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except Exception as e: return f"LLM API Error: {e}"
-
-async def extract_claims_and_bias(article_text: str):
+    json_payload = {"model": TOGETHER_AI_MODEL, "messages": messages, "temperature": 0.0, "max_tokens": 2048, "stream": True}
+    if is_json_output: json_payload["response_format"] = {"type": "json_schema", "schema": ANALYSIS_SCHEMA}
+    parts, complete = [], False
+    for attempt in range(MAX_RETRIES + 1):
+        async with _TOGETHER_SEMAPHORE:
+            async with get_http().stream("POST", TOGETHER_AI_API_URL, headers=headers, content=orjson.dumps(json_payload)) as response:
+                if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                    delay = retry_delay(response, attempt)
+                else:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"): continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            complete = True
+                            break
+                        choice = orjson.loads(data)["choices"][0]
+                        if choice.get("finish_reason") == "stop": complete = True
+                        delta = choice.get("delta", {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+                    break
+        await asyncio.sleep(delay)
+    # A stream cut off before it finished (or that produced nothing) is not cached, so the next run asks again
+    if complete and parts: llm_cache.store_response(cache_key, "".join(parts))
+
+async def call_llm(api_key: str, system: str, user: str, is_json_output: bool = False):
+    try: return "".join([delta async for delta in stream_llm(api_key, system, user, is_json_output)])
+    except Exception as e: return f"LLM API Error: {e}"
+
+# Prefill cost grows with input length; ~12k characters (~3k tokens) covers the body of a typical
+# news article. Longer documents are what main4's chunked extraction is for.
+MAX_ARTICLE_CHARS = 12000
+
+def clip(text: str, max_chars: int = MAX_ARTICLE_CHARS) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "\n\n[TRUNCATED]"
+
+_CLAIMS_START_RE = re.compile(r'"claims"\s*:\s*\[')
+_JSON_DECODER = json.JSONDecoder()  # orjson has no raw_decode, which the partial parse below needs
+
+def _take_streamed_claims(buffer: str, pos: Optional[int]):
+    """
+    Incrementally parses the "claims" array of a partially streamed JSON answer.
+    Returns the claims completed since `pos` and the position to resume from (None until the array opens).
+    """
+    if pos is None:
+        match = _CLAIMS_START_RE.search(buffer)
+        if not match: return [], None
+        pos = match.end()
+    claims = []
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,': pos += 1
+        if pos >= len(buffer) or buffer[pos] != '"': return claims, pos
+        try: claim, pos = _JSON_DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError: return claims, pos  # string not finished streaming yet
+        claims.append(claim)
+
+async def extract_claims_and_bias(article_text: str, on_claim=None):
+    """
+    Streams the combined claims/bias answer. `on_claim` (if given) is called with each claim the
+    moment its closing quote arrives, so verification can start while the LLM is still generating.
+    """
     api_key = os.getenv("TOGETHER_AI_API_KEY")
     if not api_key: return {"claims": ["ERROR: API key not found."], "bias_report": "ERROR: API key not found."}
-    claim_prompt = f"""Analyze the following news article. Identify and list every distinct factual claim... JSON object with a single key "claims"... Article:\n{article_text}"""
-    bias_prompt = f"""Analyze the tone, sentiment, and rhetorical devices... bias rating from 1 (Neutral) to 5 (Highly Biased)... Article:\n{article_text}"""
-    tasks = [call_llm(api_key, claim_prompt, is_json_output=True), call_llm(api_key, bias_prompt)]
-    results = await asyncio.gather(*tasks)
-    try: claims_data = json.loads(results[0])
-    except (json.JSONDecodeError, TypeError): claims_data = {"claims": ["LLM did not return valid JSON."]}
-    return {"claims": claims_data.get("claims", []), "bias_report": results[1]}
-
+    buffer, pos = "", None
+    try:
+        async for delta in stream_llm(api_key, ANALYSIS_SYSTEM_PROMPT, f"Article:\n{clip(article_text)}", is_json_output=True):
+            buffer += delta
+            if on_claim is None: continue
+            streamed, pos = _take_streamed_claims(buffer, pos)
+            for claim in streamed: on_claim(claim)
+        response = buffer
+    except Exception as e: response = f"LLM API Error: {e}"
+    # Output is schema-constrained, so a parse failure can only mean the LLM call returned an error message
+    try: data = orjson.loads(response)
+    except (orjson.JSONDecodeError, TypeError): data = {"claims": [f"ERROR: {response}"], "bias": response}
+    bias = data.get("bias", "")
+    if isinstance(bias, dict): bias = f"{bias.get('analysis', '')}\n\nBias Rating: {bias.get('rating', 'N/A')}/5"
+    return {"claims": data.get("claims", []), "bias_report": bias}
 
 # --- NEW: Phase 3 Functions ---
 
+_FACT_CHECK_SEMAPHORE = asyncio.Semaphore(FACT_CHECK_CONCURRENCY)
+
+async def fact_check_claim(claim: str):
+    """Vector 1 for a single claim: Google Fact Check Tools lookup over the shared HTTP/2 client."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key: return "ERROR: GOOGLE_API_KEY not found."
+    try:
+        response = await get_with_retry(_FACT_CHECK_SEMAPHORE, GOOGLE_FACT_CHECK_API_URL, params={"query": claim, "key": api_key, "languageCode": "en"})
+        data = orjson.loads(response.content)
+        if data and "claims" in data:
+            review = data["claims"][0]["claimReview"][0]
+            rating = review.get("textualRating", "N/A")
+            publisher = review.get("publisher", {}).get("name", "N/A")
+            return f"RATING: {rating} (Publisher: {publisher})"
+        return "No fact-check found."
+    except Exception:
+        return "API query failed."
+
 async def query_fact_check_api(claims: list[str]):
     """
     Vector 1: Queries the Google Fact Check Tools API for each claim.
+    All claims are queried concurrently, bounded by a semaphore.
     """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key: return {claim: "ERROR: GOOGLE_API_KEY not found." for claim in claims}
-    results = {}
-    async with httpx.AsyncClient() as client:
-        for claim in claims:
-            params = {"query": claim, "key": api_key, "languageCode": "en"}
-            try:
-                response = await client.get(GOOGLE_FACT_CHECK_API_URL, params=params)
-                data = response.json()
-                if data and "claims" in data:
-                    review = data["claims"][0]["claimReview"][0]
-                    rating = review.get("textualRating", "N/A")
-                    publisher = review.get("publisher", {}).get("name", "N/A")
-                    results[claim] = f"RATING: {rating} (Publisher: {publisher})"
-                else:
-                    results[claim] = "No fact-check found."
-            except Exception:
-                results[claim] = "API query failed."
-    return results
+    results = await asyncio.gather(*[fact_check_claim(claim) for claim in claims])
+    return dict(zip(claims, results))
+
+_SEARCH_SEMAPHORE = asyncio.Semaphore(SEARCH_CONCURRENCY)
+
+async def search_trusted_sources(claim: str, api_key: str, cse_id: str):
+    """Top 3 Tier 1 & 2 results for one claim from the Programmable Search JSON API."""
+    params = {"key": api_key, "cx": cse_id, "q": f'"{claim}" {TRUSTED_SITES_Q}', "num": 3}
+    try:
+        response = await get_with_retry(_SEARCH_SEMAPHORE, GOOGLE_CSE_API_URL, params=params)
+        response.raise_for_status()
+        return [{"title": item.get("title"), "link": item.get("link")} for item in orjson.loads(response.content).get("items", [])]
+    except Exception:
+        return []
+
+# Extractions from very large result pages are parsed in a worker thread so the event loop keeps serving I/O
+LARGE_JSON_BYTES = 1_000_000
 
-async def find_trusted_corroboration(claim: str):
+async def parse_json(raw):
+    if len(raw) > LARGE_JSON_BYTES: return await asyncio.to_thread(orjson.loads, raw)
+    return orjson.loads(raw)
+
+async def find_trusted_corroboration(crawler: AsyncWebCrawler, claims: list[str]):
     """
-    Vector 2: Uses Crawl4AI to search Google for a claim, restricted to Tier 1 & 2 news sites.
-    This method cleverly avoids needing a separate Search API key.
+    Vector 2: Searches Google for each claim, restricted to Tier 1 & 2 news sites.
+    With GOOGLE_CSE_ID set, every claim is one concurrent Programmable Search API call.
+    Otherwise Crawl4AI renders the Google results pages, all in a single arun_many batch
+    so they share the browser and its dispatcher.
     """
-    # Build a search query restricted to trusted domains from our tiering file
-    trusted_domains = [domain for domain, tier in SOURCE_TIERS.items() if tier in [1, 2]]
-    quoted_claim = f'"{claim}" '
-    sites = ' OR '.join([f'site:{domain}' for domain in trusted_domains])
-    search_query = quoted_claim + sites
-    search_url = f"https://www.google.com/search?q={urllib.parse.quote_plus(search_query)}"
+    api_key, cse_id = os.getenv("GOOGLE_API_KEY"), os.getenv("GOOGLE_CSE_ID")
+    if api_key and cse_id:
+        results = await asyncio.gather(*[search_trusted_sources(claim, api_key, cse_id) for claim in claims])
+        return dict(zip(claims, results))
+
+    crawl4ai = load_crawl4ai()
+    search_urls = [build_google_url(claim) for claim in claims]
 
     # Define a schema to extract search results directly from the Google page
     schema = {"name": "GoogleResults", "baseSelector": "div.g", "fields": [
             {"name": "title", "selector": "h3", "type": "text"},
             {"name": "link", "selector": "a", "type": "attribute", "attribute": "href"} ]}
-    config = CrawlerRunConfig(extraction_strategy=JsonCssExtractionStrategy(schema))
+    config = crawl4ai.CrawlerRunConfig(extraction_strategy=crawl4ai.JsonCssExtractionStrategy(schema), cache_mode=crawl_cache_mode())
 
-    async with AsyncWebCrawler(verbose=False) as crawler:
-        result = await crawler.arun(search_url, config=config)
-    
-    if result.success and result.extracted_content:
-        try: return json.loads(result.extracted_content)
-        except json.JSONDecodeError: return []
-    return []
+    # At most CRAWL_CONCURRENCY pages at once; 429/503 pages are retried with backoff by the rate limiter
+    dispatcher = crawl4ai.SemaphoreDispatcher(semaphore_count=CRAWL_CONCURRENCY, rate_limiter=crawl4ai.RateLimiter(base_delay=(1.0, 2.0), max_delay=30.0, max_retries=MAX_RETRIES))
+    results = await crawler.arun_many(search_urls, config=config, dispatcher=dispatcher)
+
+    corroborations = {}
+    for claim, result in zip(claims, results):
+        if result.success and result.extracted_content:
+            try: corroborations[claim] = await parse_json(result.extracted_content)
+            except orjson.JSONDecodeError: corroborations[claim] = []
+        else: corroborations[claim] = []
+    return corroborations
+
+# --- Report Cache ---
+# A finished report is stored per (source, article text hash), so re-running the same article
+# returns instantly. Keying on the text hash means an edited article is analyzed again.
+REPORT_CACHE_PATH = os.getenv("REPORT_CACHE_PATH", "_report_cache.sqlite")
+REPORT_CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL_SECONDS", 86400))
+
+_report_db: Optional[sqlite3.Connection] = None
 
+def _report_cache() -> sqlite3.Connection:
+    global _report_db
+    if _report_db is None:
+        _report_db = sqlite3.connect(REPORT_CACHE_PATH)
+        _report_db.execute("CREATE TABLE IF NOT EXISTS report_cache (url TEXT, text_sha TEXT, report_json BLOB, ts INTEGER, PRIMARY KEY (url, text_sha))")
+    return _report_db
+
+def load_cached_report(url: str, text_sha: str) -> Optional[dict]:
+    row = _report_cache().execute("SELECT report_json, ts FROM report_cache WHERE url = ? AND text_sha = ?", (url, text_sha)).fetchone()
+    if row and time.time() - row[1] < REPORT_CACHE_TTL_SECONDS: return orjson.loads(row[0])
+    return None
+
+def store_report(url: str, text_sha: str, report: dict):
+    db = _report_cache()
+    db.execute("INSERT OR REPLACE INTO report_cache (url, text_sha, report_json, ts) VALUES (?, ?, ?, ?)", (url, text_sha, orjson.dumps(report), int(time.time())))
+    db.commit()
 
 # --- Main Workflow (Updated for Phase 3) ---
 async def analyze_article(user_input: str):
@@ -123,59 +317,96 @@ async def analyze_article(user_input: str):
     print("--- Starting Full Analysis (Phase 1, 2, & 3) ---")
     input_to_crawl = f"raw://{user_input}" if not user_input.strip().startswith('http') else user_input.strip()
 
-    # Phase 1
-    phase1_output = await process_input(input_to_crawl)
-    if phase1_output["error"]:
-        print(f"\n--- Report ---\nError in Phase 1: {phase1_output['error']}")
-        return
+    # One browser instance is shared by ingestion and every corroboration search
+    async with load_crawl4ai().AsyncWebCrawler(config=browser_config()) as crawler:
+        # Phase 1
+        phase1_output = await process_input(crawler, input_to_crawl)
+        if phase1_output["error"]:
+            print(f"\n--- Report ---\nError in Phase 1: {phase1_output['error']}")
+            return
 
-    # Phase 2
-    print("Phase 1 Complete. Deconstructing content with LLM...")
-    phase2_output = await extract_claims_and_bias(phase1_output["text"])
-    claims = phase2_output.get("claims", [])
-    if not claims or "ERROR" in claims[0]:
-        print(f"\n--- Report ---\nError in Phase 2: Could not extract claims.")
-        return
+        source_key = user_input.strip() if user_input.strip().startswith('http') else 'raw_text_input'
+        text_sha = hashlib.sha256(phase1_output["text"].encode()).hexdigest()
+        cached_report = load_cached_report(source_key, text_sha)
+        if cached_report:
+            print("Phase 1 Complete. Same article was analyzed recently; using the cached report.")
+            print_report(cached_report)
+            return
 
-    # Phase 3
-    print(f"Phase 2 Complete. Triangulating {len(claims)} claims against external evidence...")
-    # Create a list of all verification tasks to run them concurrently for speed
-    fact_check_task = query_fact_check_api(claims)
-    corroboration_tasks = [find_trusted_corroboration(claim) for claim in claims]
-    
-    # Use asyncio.gather to run all network-bound tasks at the same time
-    all_evidence_results = await asyncio.gather(fact_check_task, *corroboration_tasks)
-    
-    fact_check_data = all_evidence_results[0]
-    corroboration_data = all_evidence_results[1:]
-
-    # --- Final Report ---
-    print("\n\n--- Final Analysis Report ---")
-    print("="*40)
-    print(f"Publisher Credibility Tier: {phase1_output['tier']}")
-    print("\n--- Bias & Framing Report ---")
-    print(phase2_output["bias_report"])
+        # Phases 2 & 3 form one task graph: each claim's verification starts the moment it is streamed.
+        # Tasks are keyed by the normalized claim, so a repeated claim is only ever checked once.
+        print("Phase 1 Complete. Deconstructing content with LLM...")
+        search_api = (os.getenv("GOOGLE_API_KEY"), os.getenv("GOOGLE_CSE_ID"))
+        fact_check_tasks, corroboration_tasks, batch_task = {}, {}, None
+        async with asyncio.TaskGroup() as tg:
+            def schedule_verification(claim: str):
+                key = normalize_claim(claim)
+                if key in fact_check_tasks: return
+                fact_check_tasks[key] = tg.create_task(fact_check_claim(claim))
+                if all(search_api): corroboration_tasks[key] = tg.create_task(search_trusted_sources(claim, *search_api))
+
+            phase2_output = await extract_claims_and_bias(phase1_output["text"], on_claim=schedule_verification)
+            claims = dedupe_claims(phase2_output.get("claims", []))
+            if not claims or "ERROR" in claims[0]:
+                for task in [*fact_check_tasks.values(), *corroboration_tasks.values()]: task.cancel()
+                print(f"\n--- Report ---\nError in Phase 2: Could not extract claims.")
+                return
+
+            print(f"Phase 2 Complete. Triangulating {len(claims)} claims against external evidence...")
+            for claim in claims: schedule_verification(claim)
+            # Without a search API the Google pages are rendered instead, in one arun_many batch
+            if not all(search_api): batch_task = tg.create_task(find_trusted_corroboration(crawler, claims))
+
+        fact_check_data = {claim: fact_check_tasks[normalize_claim(claim)].result() for claim in claims}
+        if batch_task: corroboration_data = batch_task.result()
+        else: corroboration_data = {claim: corroboration_tasks[normalize_claim(claim)].result() for claim in claims}
+
+    report = {
+        "tier": phase1_output["tier"],
+        "bias_report": phase2_output["bias_report"],
+        "claims": claims,
+        "fact_checks": fact_check_data,
+        "corroborations": corroboration_data
+    }
+    store_report(source_key, text_sha, report)
+    print_report(report)
+
+def print_report(report: dict):
+    # The report is assembled in memory and written to stdout in one go, not one syscall per line
+    buf = io.StringIO()
+    claims, fact_check_data, corroboration_data = report["claims"], report["fact_checks"], report["corroborations"]
+    print("\n\n--- Final Analysis Report ---", file=buf)
+    print("="*40, file=buf)
+    print(f"Publisher Credibility Tier: {report['tier']}", file=buf)
+    print("\n--- Bias & Framing Report ---", file=buf)
+    print(report["bias_report"], file=buf)
     
-    print("\n--- Claim-by-Claim Verification ---")
+    print("\n--- Claim-by-Claim Verification ---", file=buf)
     if not claims:
-        print("No factual claims were extracted for verification.")
+        print("No factual claims were extracted for verification.", file=buf)
     else:
         for i, claim in enumerate(claims):
-            print(f"\n▶ Claim #{i+1}: \"{claim}\"")
-            print(f"  ┃")
-            print(f"  ┣━ Fact-Check DB: {fact_check_data.get(claim, 'N/A')}")
-            print(f"  ┗━ Trusted Corroboration:")
-            corroborations = corroboration_data[i]
+            print(f"\n▶ Claim #{i+1}: \"{claim}\"", file=buf)
+            print(f"  ┃", file=buf)
+            print(f"  ┣━ Fact-Check DB: {fact_check_data.get(claim, 'N/A')}", file=buf)
+            print(f"  ┗━ Trusted Corroboration:", file=buf)
+            corroborations = corroboration_data.get(claim, [])
             if corroborations:
                 for c in corroborations[:3]: # Show top 3 results
-                    print(f"     • {c.get('title', 'No Title')}")
-                    print(f"       ({c.get('link', '#')})")
+                    print(f"     • {c.get('title', 'No Title')}", file=buf)
+                    print(f"       ({c.get('link', '#')})", file=buf)
             else:
-                print("     - No corroboration found in Tier 1 & 2 sources.")
+                print("     - No corroboration found in Tier 1 & 2 sources.", file=buf)
+
+    print("\n" + "="*40, file=buf)
+    print("--- Analysis Complete ---", file=buf)
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
 
-    print("\n" + "="*40)
-    print("--- Analysis Complete ---")
+async def main(user_input: str):
+    try: await analyze_article(user_input)
+    finally: await close_http()
 
 if __name__ == "__main__":
     url_to_check = "https://timesofindia.indiatimes.com/technology/tech-tips/rise-in-covid-19-cases-7-essential-medical-gadgets-for-home-use/articleshow/121653588.cms"
-    asyncio.run(analyze_article(url_to_check))
\ No newline at end of file
+    run(main(url_to_check))
\ No newline at end of file
@@ -1,14 +1,23 @@
 # filename: main.py
 
 import asyncio
+import heapq
+import math
 import os
-import json
+import sys
+import orjson
 import httpx
 from dotenv import load_dotenv
-import urllib.parse
+from aiolimiter import AsyncLimiter
 import re
+from collections import Counter
 
-from source_tiering import get_source_tier, SOURCE_TIERS
+from source_tiering import get_source_tier
+from pipeline_utils import normalize_claim, dedupe_claims, retry_delay, build_google_url, TRUSTED_SITES_Q, run
+import llm_cache
+import semantic_cache
+import fact_check_cache
+import page_cache
 from crawl4ai import (
     AsyncWebCrawler,
     CrawlerRunConfig,
@@ -19,174 +28,345 @@ from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 
 load_dotenv()
 
+# --- API Keys (read once; the environment does not change while the script runs) ---
+TOGETHER_AI_API_KEY = os.getenv("TOGETHER_AI_API_KEY")
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Programmable Search engine id; with it set, corroboration uses the JSON API instead of rendering Google result pages
+GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
+
 # --- Configurations ---
 TOGETHER_AI_MODEL = "meta-llama/Llama-3-70b-chat-hf"
 TOGETHER_AI_API_URL = "https://api.together.xyz/v1/chat/completions"
 GOOGLE_FACT_CHECK_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
-CHARACTER_LIMIT_FOR_CHUNKING = 15000
+GOOGLE_CSE_API_URL = "https://www.googleapis.com/customsearch/v1"
+SEARCH_CONCURRENCY = 10
+# Llama-3-70b has an 8k-token window: ~24k characters of article leaves room for the instructions
+# and a 2k-token answer. Anything that fits goes out as one prompt; longer articles are split evenly
+# into the fewest chunks of at most this size.
+MAX_PROMPT_CHARS = 24000
+CHARACTER_LIMIT_FOR_CHUNKING = MAX_PROMPT_CHARS
+CHUNK_OVERLAP = 500
+# Upper bound on outstanding fact-check requests / SERP pages, so large claim lists queue instead of
+# opening hundreds of sockets (and collecting Google 429s)
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", 20))
+# Parsed Google result pages are reused for this long, so re-running an analysis skips the SERP crawls
+SERP_CACHE_TTL_SECONDS = 3600
+# Claims whose embeddings are at least this similar (cosine) are paraphrases and share one evidence lookup
+CLAIM_SIMILARITY_THRESHOLD = 0.9
+# At most this many distinct claims get evidence gathered; the most informative ones are kept
+MAX_CLAIMS = int(os.getenv("MAX_CLAIMS", 20))
+# Together requests are paced by the account's request-per-minute budget: a call only waits when the
+# bucket is empty, instead of every call holding a slot and sleeping
+TOGETHER_RPM = int(os.getenv("TOGETHER_RPM", 60))
+_llm_limiter = AsyncLimiter(max_rate=TOGETHER_RPM, time_period=60)
+# Above this size, claim-JSON parsing moves to a worker thread so the event loop stays responsive
+CHARACTER_LIMIT_FOR_THREADED_PARSING = 100_000
+
+# --- Shared HTTP Client: one HTTP/2 connection pool reused by every Together AI and Fact Check call ---
+_client = httpx.AsyncClient(
+    timeout=120.0,
+    http2=True,
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+)
+FACT_CHECK_TIMEOUT = 10.0
+# Rate-limit and transient server answers from the Fact Check API are retried with backoff
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 3
+# Retried answers per status code over the process lifetime, for tuning MAX_INFLIGHT against Google's QPS
+RETRY_COUNTS = Counter()
+
+async def close_http_client():
+    await _client.aclose()
+
+# --- Shared crawler: one browser, started on first use and reused by every phase and every analysis ---
+_CRAWLER: AsyncWebCrawler | None = None
+
+async def get_crawler() -> AsyncWebCrawler:
+    global _CRAWLER
+    if _CRAWLER is None:
+        _CRAWLER = AsyncWebCrawler(verbose=False)
+        await _CRAWLER.start()
+    return _CRAWLER
+
+async def close_crawler():
+    global _CRAWLER
+    if _CRAWLER is not None:
+        await _CRAWLER.close()
+        _CRAWLER = None
 
 # --- Phase 1 & 3 Functions (Unchanged) ---
 # ... (process_input, call_llm, batch_query_fact_checks, batch_find_trusted_corroboration functions are unchanged) ...
-async def process_input(input_content: str):
+async def process_input(crawler: AsyncWebCrawler, input_content: str):
+    source_url = input_content if input_content.startswith('http') else 'raw_text_input'
+    # An unchanged page (ETag / Last-Modified still match) or previously seen raw text skips the browser
+    cached_text = await page_cache.load(_client, "fit_markdown", input_content)
+    if cached_text is not None: return {"tier": get_source_tier(source_url), "text": cached_text, "error": None}
     md_generator = DefaultMarkdownGenerator(content_filter=PruningContentFilter(threshold=0.5))
     config = CrawlerRunConfig(markdown_generator=md_generator)
-    source_url = input_content if input_content.startswith('http') else 'raw_text_input'
-    async with AsyncWebCrawler(verbose=False) as crawler:
-        result = await crawler.arun(input_content, config=config)
+    result = await crawler.arun(input_content, config=config)
     if result.success and result.markdown:
         tier = get_source_tier(source_url)
         core_text = result.markdown.fit_markdown 
+        page_cache.store("fit_markdown", input_content, core_text, result.response_headers)
         return {"tier": tier, "text": core_text, "error": None}
     return {"error": result.error_message, "tier": None, "text": None}
 
 async def call_llm(api_key: str, prompt: str, is_json_output: bool = False):
+    messages = [{"role": "user", "content": prompt}]
+    # Exact repeats (temperature 0.0 makes them deterministic) are answered from the SQLite cache. Prompts carry
+    # whole articles, so there is no near-duplicate reuse: an edited article must be extracted again.
+    cache_key = llm_cache.make_key(TOGETHER_AI_MODEL, messages, is_json_output)
+    cached = llm_cache.get_cached_response(cache_key)
+    if cached is not None: return cached
     headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    json_payload = {"model": TOGETHER_AI_MODEL, "messages": [{"role": "user", "content": prompt}], "temperature": 0.0, "max_tokens": 2048}
+    json_payload = {"model": TOGETHER_AI_MODEL, "messages": messages, "temperature": 0.0, "max_tokens": 2048}
     if is_json_output: json_payload["response_format"] = {"type": "json_object"}
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            response = await client.post(TOGETHER_AI_API_URL, headers=headers, json=json_payload)
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
-        except httpx.HTTPStatusError as e: return f"LLM_API_ERROR: {e.response.status_code} - {e.response.text}"
-        except Exception as e: return f"LLM_API_ERROR: {e}"
+    try:
+        async with _llm_limiter:
+            response = await _client.post(TOGETHER_AI_API_URL, headers=headers, content=orjson.dumps(json_payload))
+        response.raise_for_status()
+        content = orjson.loads(response.content)["choices"][0]["message"]["content"]
+        llm_cache.store_response(cache_key, content)
+        return content
+    except httpx.HTTPStatusError as e: return f"LLM_API_ERROR: {e.response.status_code} - {e.response.text}"
+    except Exception as e: return f"LLM_API_ERROR: {e}"
 
 async def batch_query_fact_checks(claims: list[str]):
-    api_key = os.getenv("GOOGLE_API_KEY")
+    api_key = GOOGLE_API_KEY
     if not api_key: return {claim: "ERROR: GOOGLE_API_KEY not found." for claim in claims}
-    results = {}
-    async with httpx.AsyncClient() as client:
-        tasks = [client.get(GOOGLE_FACT_CHECK_API_URL, params={"query": claim, "key": api_key, "languageCode": "en"}) for claim in claims]
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
-        for i, response in enumerate(responses):
-            claim = claims[i]
-            if isinstance(response, Exception): results[claim] = "API query failed."
-            else:
-                data = response.json()
-                if data and "claims" in data:
-                    review = data["claims"][0]["claimReview"][0]
-                    rating, publisher = review.get("textualRating", "N/A"), review.get("publisher", {}).get("name", "N/A")
-                    results[claim] = f"RATING: {rating} (Publisher: {publisher})"
-                else: results[claim] = "No fact-check found."
+    # Claims that normalize the same share one lookup; results from earlier runs come from the disk cache
+    cache_keys = {claim: fact_check_cache.make_key(normalize_claim(claim)) for claim in claims}
+    by_key = fact_check_cache.get_many(list(set(cache_keys.values())))
+    misses = list({key: claim for claim, key in cache_keys.items() if key not in by_key}.items())
+    semaphore = asyncio.Semaphore(MAX_INFLIGHT)
+    # Shared by every query; the requests are multiplexed over the client's HTTP/2 connection
+    base_params = {"key": api_key, "languageCode": "en"}
+
+    async def fetch(claim):
+        params = {**base_params, "query": claim}
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                response = await _client.get(GOOGLE_FACT_CHECK_API_URL, params=params, timeout=FACT_CHECK_TIMEOUT)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES: return response
+                RETRY_COUNTS[response.status_code] += 1
+                await asyncio.sleep(retry_delay(response, attempt))
+        except Exception as e: return e
+
+    tasks = []
+    async with asyncio.TaskGroup() as tg:
+        for _, claim in misses:
+            # Backpressure: the next request is only created once one of the in-flight ones finishes
+            await semaphore.acquire()
+            task = tg.create_task(fetch(claim))
+            task.add_done_callback(lambda _: semaphore.release())
+            tasks.append(task)
+    responses = [task.result() for task in tasks]
+    fresh = {}
+    for (key, _), response in zip(misses, responses):
+        # Only answered queries are parsed and kept; failures, error statuses and non-JSON bodies are retried next run
+        if isinstance(response, Exception) or not response.is_success:
+            by_key[key] = "API query failed."
+            continue
+        try: data = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            by_key[key] = "API query failed."
+            continue
+        if data and "claims" in data:
+            review = data["claims"][0]["claimReview"][0]
+            rating, publisher = review.get("textualRating", "N/A"), review.get("publisher", {}).get("name", "N/A")
+            by_key[key] = f"RATING: {rating} (Publisher: {publisher})"
+        else: by_key[key] = "No fact-check found."
+        fresh[key] = by_key[key]
+    fact_check_cache.set_many(fresh)
+    return {claim: by_key[key] for claim, key in cache_keys.items()}
+
+async def search_trusted_sources(semaphore: asyncio.Semaphore, claim: str):
+    """Top 3 Tier 1 & 2 results for one claim from the Programmable Search JSON API; [] if the query fails."""
+    params = {"key": GOOGLE_API_KEY, "cx": GOOGLE_CSE_ID, "q": f'"{claim}" {TRUSTED_SITES_Q}', "num": 3}
+    try:
+        async with semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                response = await _client.get(GOOGLE_CSE_API_URL, params=params, timeout=FACT_CHECK_TIMEOUT)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES: break
+                RETRY_COUNTS[response.status_code] += 1
+                await asyncio.sleep(retry_delay(response, attempt))
+        response.raise_for_status()
+        return [{"title": item.get("title"), "link": item.get("link")} for item in orjson.loads(response.content).get("items", [])]
+    except Exception:
+        return None
+
+async def batch_search_trusted_sources(claims: list[str]):
+    """One concurrent search API call per claim, at most SEARCH_CONCURRENCY at a time."""
+    cached = {claim: page_cache.load_recent("cse", claim, SERP_CACHE_TTL_SECONDS) for claim in claims}
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    async with asyncio.TaskGroup() as tg:
+        tasks = {claim: tg.create_task(search_trusted_sources(semaphore, claim)) for claim in claims if cached[claim] is None}
+    results = []
+    for claim in claims:
+        if cached[claim] is not None: results.append(orjson.loads(cached[claim]))
+        elif (found := tasks[claim].result()) is None: results.append([])  # Failed queries are not cached, so they are retried
+        else:
+            page_cache.store("cse", claim, orjson.dumps(found).decode())
+            results.append(found)
     return results
 
-async def batch_find_trusted_corroboration(claims: list[str]):
+async def batch_find_trusted_corroboration(crawler: AsyncWebCrawler, claims: list[str]):
     """
-    Vector 2: Uses a single Crawl4AI instance and arun_many to efficiently search for all claims.
+    Vector 2: Searches Google for each claim, restricted to Tier 1 & 2 news sites.
+    With GOOGLE_CSE_ID set this is one Programmable Search API call per claim; otherwise the caller's
+    Crawl4AI instance renders the Google result pages with arun_many.
     """
     print(f"Starting batch corroboration search for {len(claims)} claims...")
-    trusted_domains = [domain for domain, tier in SOURCE_TIERS.items() if tier in [1, 2]]
-    
-    search_urls = []
-    for claim in claims:
-        quoted_claim = f'"{claim}" '
-        sites = ' OR '.join([f'site:{domain}' for domain in trusted_domains])
-        search_query = quoted_claim + sites
-        search_url = f"https://www.google.com/search?q={urllib.parse.quote_plus(search_query)}"
-        search_urls.append(search_url)
+    if GOOGLE_API_KEY and GOOGLE_CSE_ID: return await batch_search_trusted_sources(claims)
+    search_urls = [build_google_url(claim) for claim in claims]
+    # Recently parsed result pages are reused from disk; only the rest are crawled
+    cached = {url: page_cache.load_recent("serp", url, SERP_CACHE_TTL_SECONDS) for url in search_urls}
+    to_crawl = [url for url in search_urls if cached[url] is None]
 
     schema = {"name": "GoogleResults", "baseSelector": "div.g", "fields": [{"name": "title", "selector": "h3", "type": "text"}, {"name": "link", "selector": "a", "type": "attribute", "attribute": "href"}]}
     config = CrawlerRunConfig(extraction_strategy=JsonCssExtractionStrategy(schema))
 
-    # Instantiate the crawler ONCE
-    async with AsyncWebCrawler() as crawler:
-        # Use arun_many to process all URLs in a managed pool
-        results = await crawler.arun_many(urls=search_urls, config=config)
-    
+    # Use arun_many to process the URLs in a managed pool, at most MAX_INFLIGHT pages per batch.
+    # Its dispatcher returns results in completion order, so they are matched back by their requested URL
+    results_by_url = {}
+    for start in range(0, len(to_crawl), MAX_INFLIGHT):
+        for result in await crawler.arun_many(urls=to_crawl[start:start + MAX_INFLIGHT], config=config):
+            results_by_url[result.url] = result
+
     # Process the list of results
-    final_corroborations = []
-    for result in results:
-        if result.success and result.extracted_content:
+    corroborations_by_url = {url: orjson.loads(hit) for url, hit in cached.items() if hit is not None}
+    for url in to_crawl:
+        result = results_by_url.get(url)
+        if result is not None and result.success and result.extracted_content:
             try:
-                final_corroborations.append(json.loads(result.extracted_content))
-            except json.JSONDecodeError:
-                final_corroborations.append([])
+                corroborations_by_url[url] = orjson.loads(result.extracted_content)
+                page_cache.store("serp", url, orjson.dumps(corroborations_by_url[url]).decode())
+            except orjson.JSONDecodeError:
+                corroborations_by_url[url] = []
         else:
-            final_corroborations.append([]) # Append an empty list for failed crawls
-            
-    return final_corroborations
-
-def chunk_text(text: str, chunk_size: int = 15000, overlap: int = 500):
-    if len(text) <= chunk_size: return [text]
-    chunks = []; start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
+            corroborations_by_url[url] = [] # Empty list for failed crawls (not cached, so they are retried)
+
+    return [corroborations_by_url[url] for url in search_urls]
+
+def even_chunk_size(length: int, budget: int = MAX_PROMPT_CHARS, overlap: int = CHUNK_OVERLAP) -> int:
+    """Chunk size that splits `length` characters into the fewest equal chunks of at most `budget`."""
+    if length <= budget: return budget
+    chunk_count = math.ceil((length - overlap) / (budget - overlap))
+    return math.ceil((length - overlap) / chunk_count) + overlap
+
+def chunk_text(text: str, chunk_size: int = 15000, overlap: int = CHUNK_OVERLAP):
+    """Yields the chunks lazily, so each slice only lives until its prompt has been built."""
+    step = chunk_size - overlap
+    # Stopping `overlap` short of the end means the last chunk always has new text in it,
+    # instead of a sliver already covered by the previous chunk's overlap (text within chunk_size is one chunk)
+    for start in range(0, max(1, len(text) - overlap), step):
+        yield text[start:start + chunk_size]
+
+# Bias is rated in the same request as the claims, so the article is only sent (and paid for) once
+BIAS_INSTRUCTIONS = ("also analyze the tone, sentiment... rate its bias from 1 (Neutral) to 5 (Highly Biased) as \"bias_rating\" "
+                     "and give the specific examples behind the rating as \"bias_notes\".")
+
+def _extract_claim_strings(res: str, out: list, biases: list):
+    """
+    Parses one LLM {"claims": [...], "bias_rating": ..., "bias_notes": ...} response and appends every
+    claim string it holds to `out` and its (bias_rating, bias_notes) pair to `biases`.
+    """
+    data = orjson.loads(res)
+    if not isinstance(data, dict): return  # e.g. a bare JSON list: no claims from this response
+    if isinstance(data.get('bias_rating'), int): biases.append((data['bias_rating'], str(data.get('bias_notes', ''))))
+    claims_list = data.get('claims', [])
+    if not isinstance(claims_list, list): return
+    for item in claims_list:
+        # A dict item contributes its first string value
+        if isinstance(item, dict): item = next((value for value in item.values() if isinstance(value, str)), None)
+        if isinstance(item, str): out.append(item)
+
+def summarize_bias(biases: list) -> str:
+    """The article is rated by its most biased chunk; that chunk's notes explain the rating."""
+    if not biases: return "Bias analysis failed."
+    rating, notes = max(biases, key=lambda bias: bias[0])
+    return f"{notes}\n\nBias rating: {rating}/5"
 
 # --- UPDATED: Phase 2 function with robust parsing ---
 async def extract_claims_and_bias(article_text: str):
-    api_key = os.getenv("TOGETHER_AI_API_KEY")
+    api_key = TOGETHER_AI_API_KEY
     if not api_key: return {"claims": ["ERROR: API key not found."], "bias_report": "ERROR: API key not found."}
 
-    bias_prompt = f"""Analyze the tone, sentiment... bias rating from 1 (Neutral) to 5 (Highly Biased)... Article:\n{article_text[:CHARACTER_LIMIT_FOR_CHUNKING]}"""
-    bias_task = call_llm(api_key, bias_prompt)
-
-    claim_prompt_template = """Analyze... Present the output as a JSON object with a single key "claims"... Article Text:\n{}"""
+    claim_prompt_template = f"""Analyze... Then {BIAS_INSTRUCTIONS} Present the output as a JSON object with the keys "claims", "bias_rating" and "bias_notes"... Article Text:\n{{}}"""
     
-    all_claims = []
+    all_claims, biases = [], []
     
     if len(article_text) > CHARACTER_LIMIT_FOR_CHUNKING:
         print(f"Article text is long ({len(article_text)} chars), splitting into chunks...")
-        text_chunks = chunk_text(article_text)
-        claim_tasks = [call_llm(api_key, claim_prompt_template.format(chunk), is_json_output=True) for chunk in text_chunks]
-        all_tasks = [bias_task] + claim_tasks
-        results = await asyncio.gather(*all_tasks)
-        
-        bias_report, claim_results = results[0], results[1:]
-        
-        for res in claim_results:
+        # Even chunks sized to the prompt budget: ceil(len / budget) round trips, with no undersized tail chunk.
+        # Each chunk is only referenced by its prompt, which is dropped as its request completes
+        claim_tasks = [call_llm(api_key, claim_prompt_template.format(chunk), is_json_output=True)
+                       for chunk in chunk_text(article_text, even_chunk_size(len(article_text)))]
+
+        parse_in_thread = len(article_text) > CHARACTER_LIMIT_FOR_THREADED_PARSING
+        loop = asyncio.get_running_loop()
+
+        # Parse each chunk's claims as soon as it arrives, while the other calls are still in flight
+        for next_result in asyncio.as_completed(claim_tasks):
+            res = await next_result
             if "LLM_API_ERROR" in res: continue
             try:
-                data = json.loads(res)
-                # --- NEW ROBUST PARSING LOGIC ---
-                claims_list = data.get('claims', [])
-                if isinstance(claims_list, list):
-                    for item in claims_list:
-                        if isinstance(item, str):
-                            all_claims.append(item)
-                        elif isinstance(item, dict):
-                            # If item is a dict, extract the first string value found
-                            for value in item.values():
-                                if isinstance(value, str):
-                                    all_claims.append(value)
-                                    break 
-                # --- END NEW LOGIC ---
-            except (json.JSONDecodeError, TypeError): continue
+                if parse_in_thread: await loop.run_in_executor(None, _extract_claim_strings, res, all_claims, biases)
+                else: _extract_claim_strings(res, all_claims, biases)
+            except (orjson.JSONDecodeError, TypeError): continue
     else:
         claim_prompt = claim_prompt_template.format(article_text)
-        claim_task = call_llm(api_key, claim_prompt, is_json_output=True)
-        bias_report, claim_result = await asyncio.gather(bias_task, claim_task)
+        claim_result = await call_llm(api_key, claim_prompt, is_json_output=True)
         if "LLM_API_ERROR" in claim_result: all_claims.append(claim_result)
         else:
             try:
-                data = json.loads(claim_result)
-                # --- NEW ROBUST PARSING LOGIC (for non-chunked text too) ---
-                claims_list = data.get('claims', [])
-                if isinstance(claims_list, list):
-                    for item in claims_list:
-                        if isinstance(item, str):
-                            all_claims.append(item)
-                        elif isinstance(item, dict):
-                            for value in item.values():
-                                if isinstance(value, str):
-                                    all_claims.append(value)
-                                    break
-                # --- END NEW LOGIC ---
-            except (json.JSONDecodeError, TypeError): all_claims.append("LLM did not return valid JSON.")
-
-    # Now the set() operation will be safe as all_claims only contains strings
-    final_claims = sorted(list(set(all_claims)))
-    return {"claims": final_claims, "bias_report": bias_report}
+                _extract_claim_strings(claim_result, all_claims, biases)
+            except (orjson.JSONDecodeError, TypeError): all_claims.append("LLM did not return valid JSON.")
+
+    return {"claims": dedupe_claims(all_claims), "bias_report": summarize_bias(biases)}
+
+def _group_paraphrases(claims: list[str]):
+    """Greedy clustering: each claim joins the first earlier representative it is similar enough to."""
+    vectors = semantic_cache.embed(claims)
+    similarity = vectors @ vectors.T
+    representative_idx, rep_of = [], {}
+    for i, claim in enumerate(claims):
+        match = next((j for j in representative_idx if similarity[i, j] >= CLAIM_SIMILARITY_THRESHOLD), None)
+        if match is None: representative_idx.append(i)
+        rep_of[claim] = claims[i if match is None else match]
+    return [claims[j] for j in representative_idx], rep_of
+
+# Capitalized words, acronyms and figures: a cheap stand-in for named entities and numbers, which make a claim checkable
+_ENTITY_RE = re.compile(r'\b(?:[A-Z][a-z]+|[A-Z]{2,}|\d[\d,.%]*)')
+
+def claim_informativeness(claim: str) -> int:
+    return len(claim) + 2 * len(_ENTITY_RE.findall(claim))
+
+def select_top_claims(claims: list[str], k: int) -> list[str]:
+    """The k most informative claims, in extraction order."""
+    if len(claims) <= k: return claims
+    top = set(heapq.nlargest(k, range(len(claims)), key=lambda i: claim_informativeness(claims[i])))
+    return [claim for i, claim in enumerate(claims) if i in top]
+
+async def collapse_paraphrases(claims: list[str]):
+    """
+    Returns (representative claims, claim -> representative). Evidence is gathered for the
+    representatives only. Without the optional embedding model every claim represents itself.
+    """
+    if len(claims) < 2 or not semantic_cache.enabled(): return claims, {claim: claim for claim in claims}
+    return await asyncio.to_thread(_group_paraphrases, claims)
 
 # --- Main Workflow (no changes needed) ---
 async def analyze_article(user_input: str):
     # This main function is now ready for the final Phase 4 implementation.
     # For now, it will run the fixed Phase 2 and working Phase 3.
+    # One browser serves both Phase 1 ingestion and the Phase 3 searches, and stays up for the next article
+    await run_pipeline(await get_crawler(), user_input)
+
+async def run_pipeline(crawler: AsyncWebCrawler, user_input: str):
     print("--- Starting Full Analysis ---")
     input_to_crawl = f"raw://{user_input}" if not user_input.strip().startswith('http') else user_input.strip()
-    phase1 = await process_input(input_to_crawl)
+    phase1 = await process_input(crawler, input_to_crawl)
     if phase1["error"]: print(f"\nReport Error in Phase 1: {phase1['error']}"); return
     
     print("Phase 1 Complete. Deconstructing content...")
@@ -194,29 +374,48 @@ async def analyze_article(user_input: str):
     claims = phase2.get("claims", [])
     if not claims or ("ERROR" in claims[0] if claims else False): print(f"\nReport Error in Phase 2: {claims[0] if claims else 'Could not extract claims.'}"); return
 
-    print(f"Phase 2 Complete. Triangulating {len(claims)} claims...")
-    fact_check_task = batch_query_fact_checks(claims)
-    corroboration_task = batch_find_trusted_corroboration(claims)
-    results = await asyncio.gather(fact_check_task, corroboration_task)
-    fact_check_data, corroboration_data = results[0], results[1]
-
-    print("\n\n--- Analysis Report (Phases 1-3) ---")
-    print("="*40)
-    print(f"Publisher Credibility Tier: {phase1['tier']}")
-    print("\n--- Bias & Framing Report ---")
-    print(phase2["bias_report"])
-    print("\n--- Claim-by-Claim Verification ---")
+    # Paraphrases share one evidence lookup, and Phase 3 spend is bounded by checking only the
+    # MAX_CLAIMS most informative distinct claims of the whole article (ranked once, across all chunks)
+    representatives, rep_of = await collapse_paraphrases(claims)
+    representatives = select_top_claims(representatives, MAX_CLAIMS)
+    print(f"-> Triangulating {len(representatives)} claims...")
+    async with asyncio.TaskGroup() as tg:
+        fact_check_task = tg.create_task(batch_query_fact_checks(representatives))
+        corroboration_task = tg.create_task(batch_find_trusted_corroboration(crawler, representatives))
+    fact_check_by_rep = fact_check_task.result()
+    corroboration_by_rep = dict(zip(representatives, corroboration_task.result()))
+
+    # Claims whose representative fell outside MAX_CLAIMS have no evidence and are left out of the report
+    checked = set(representatives)
+    skipped = [claim for claim in claims if rep_of.get(claim, claim) not in checked]
+    claims = [claim for claim in claims if rep_of.get(claim, claim) in checked]
+    print(f"Phases 2-3 Complete. Triangulated {len(claims)} claims ({len(representatives)} distinct, {len(skipped)} skipped over MAX_CLAIMS).")
+
+    # Expand the representatives' evidence back onto every claim they stand for
+    fact_check_data = {claim: fact_check_by_rep.get(rep_of.get(claim, claim), "N/A") for claim in claims}
+    corroboration_data = [corroboration_by_rep.get(rep_of.get(claim, claim), []) for claim in claims]
+
+    # The report is assembled in memory and written to stdout in one go, not one print per line
+    parts = ["\n\n--- Analysis Report (Phases 1-3) ---", "="*40, f"Publisher Credibility Tier: {phase1['tier']}",
+             "\n--- Bias & Framing Report ---", phase2["bias_report"], "\n--- Claim-by-Claim Verification ---"]
     for i, claim in enumerate(claims):
-        print(f"\n▶ Claim #{i+1}: \"{claim}\"")
-        print(f"  ┣━ Fact-Check DB: {fact_check_data.get(claim, 'N/A')}")
-        print(f"  ┗━ Trusted Corroboration:")
+        parts += [f"\n▶ Claim #{i+1}: \"{claim}\"", f"  ┣━ Fact-Check DB: {fact_check_data.get(claim, 'N/A')}", "  ┗━ Trusted Corroboration:"]
         corroborations = corroboration_data[i] if i < len(corroboration_data) else []
-        if corroborations:
-            for c in corroborations[:3]: print(f"     • {c.get('title', 'N/A')} ({c.get('link', '#')})")
-        else: print("     - No corroboration found in Tier 1 & 2 sources.")
-    print("\n" + "="*40)
-    print("--- Analysis Complete ---")
+        if corroborations: parts += [f"     • {c.get('title', 'N/A')} ({c.get('link', '#')})" for c in corroborations[:3]]
+        else: parts.append("     - No corroboration found in Tier 1 & 2 sources.")
+    parts += ["\n" + "="*40, "--- Analysis Complete ---"]
+    sys.stdout.write("\n".join(parts) + "\n")
+    sys.stdout.flush()
+
+async def main(user_input: str):
+    try: await analyze_article(user_input)
+    finally:
+        await close_crawler()
+        await close_http_client()
 
 if __name__ == "__main__":
+    if not all([TOGETHER_AI_API_KEY, GOOGLE_API_KEY]):
+        raise SystemExit("FATAL ERROR: Please set TOGETHER_AI_API_KEY and GOOGLE_API_KEY in your .env file.")
+
     url_to_check = "https://timesofindia.indiatimes.com/technology/top-10-useful-gadgets-for-home-use/articleshow/121653588.cms"
-    asyncio.run(analyze_article(url_to_check))
\ No newline at end of file
+    run(main(url_to_check))
\ No newline at end of file
@@ -0,0 +1,65 @@
+# filename: page_cache.py
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Optional
+
+import httpx
+
+# Ingested article content, persisted so re-analyzing the same input skips the headless browser.
+# URL entries are revalidated with a conditional HEAD (ETag / Last-Modified) before being reused;
+# pages that send neither validator are reused for PAGE_CACHE_TTL_SECONDS instead.
+# Raw text is keyed by its SHA-256, so an entry for it can never be stale.
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "_page_cache.sqlite")
+PAGE_CACHE_TTL_SECONDS = 3600
+REVALIDATE_TIMEOUT = 5.0
+
+_db: Optional[sqlite3.Connection] = None
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(PAGE_CACHE_PATH)
+        _db.execute("CREATE TABLE IF NOT EXISTS page_cache (key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content TEXT, ts INTEGER)")
+    return _db
+
+def cache_key(kind: str, input_content: str) -> str:
+    """`kind` separates the different extractions (e.g. fit_markdown vs cleaned_html) of the same input."""
+    if input_content.startswith('http'):
+        return f"{kind}:{input_content}"
+    return f"{kind}:sha256:{hashlib.sha256(input_content.encode()).hexdigest()}"
+
+async def load(client: httpx.AsyncClient, kind: str, input_content: str) -> Optional[str]:
+    """Returns the cached content if it is still current, otherwise None (the caller crawls again)."""
+    row = _connect().execute("SELECT etag, last_modified, content, ts FROM page_cache WHERE key = ?", (cache_key(kind, input_content),)).fetchone()
+    if row is None: return None
+    etag, last_modified, content, ts = row
+    if not input_content.startswith('http'): return content
+    if not (etag or last_modified): return content if time.time() - ts < PAGE_CACHE_TTL_SECONDS else None
+
+    headers = {}
+    if etag: headers["If-None-Match"] = etag
+    if last_modified: headers["If-Modified-Since"] = last_modified
+    try:
+        response = await client.head(input_content, headers=headers, follow_redirects=True, timeout=REVALIDATE_TIMEOUT)
+    except httpx.HTTPError:
+        return None
+    if response.status_code == 304: return content
+    # Some servers ignore conditional headers on HEAD but still report the current validator
+    if response.is_success and etag and response.headers.get("etag") == etag: return content
+    return None
+
+def load_recent(kind: str, input_content: str, max_age: float = PAGE_CACHE_TTL_SECONDS) -> Optional[str]:
+    """TTL-only lookup, for derived results (e.g. parsed search pages) that have no validators to check."""
+    row = _connect().execute("SELECT content, ts FROM page_cache WHERE key = ?", (cache_key(kind, input_content),)).fetchone()
+    return row[0] if row and time.time() - row[1] < max_age else None
+
+def store(kind: str, input_content: str, content: str, response_headers: Optional[dict] = None):
+    headers = {name.lower(): value for name, value in (response_headers or {}).items()}
+    etag, last_modified = headers.get("etag"), headers.get("last-modified")
+    db = _connect()
+    db.execute("INSERT OR REPLACE INTO page_cache (key, etag, last_modified, content, ts) VALUES (?, ?, ?, ?, ?)",
+               (cache_key(kind, input_content), etag, last_modified, content, int(time.time())))
+    db.commit()
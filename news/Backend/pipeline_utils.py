@@ -0,0 +1,81 @@
+# filename: pipeline_utils.py
+
+import asyncio
+import os
+import re
+import urllib.parse
+
+import httpx
+
+from source_tiering import TIER_TO_DOMAINS
+
+# Helpers shared by the pipeline scripts (main through final_main), so they normalize claims,
+# back off, build trusted-source searches, load Crawl4AI and start their event loop the same way.
+
+# --- Claim normalization ---
+_NON_WORD_RE = re.compile(r'\W+')
+# List markers the LLM sometimes puts in front of a claim ("- ", "* ", "3. ", "2) "); "2.5 million" is left alone
+_BULLET_RE = re.compile(r'^\s*(?:[-*\u2022]|\d+[.)])\s+')
+
+def normalize_claim(claim: str) -> str:
+    """Collapses case, punctuation, whitespace and list markers so trivially different claims compare equal."""
+    return _NON_WORD_RE.sub(' ', _BULLET_RE.sub('', claim)).strip().casefold()
+
+def dedupe_claims(claims: list[str]) -> list[str]:
+    """Drops repeated claims in O(n), keeping the first wording and the order they were extracted in."""
+    unique = {}
+    for claim in claims: unique.setdefault(normalize_claim(claim), claim)
+    return list(unique.values())
+
+# --- Retries ---
+def retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before the next attempt: the server's Retry-After if it sent one, else 1s, 2s, 4s..."""
+    retry_after = response.headers.get("Retry-After", "")
+    return float(retry_after) if retry_after.isdigit() else 2 ** attempt
+
+# --- Trusted-source searches ---
+def trusted_sites_query(domains) -> str:
+    return ' OR '.join(f'site:{domain}' for domain in domains)
+
+def encode_sites_suffix(sites_query: str) -> str:
+    """URL-encodes the site restriction once; quote_plus encodes piecewise, so only the claim is encoded per search."""
+    return urllib.parse.quote_plus(' ' + sites_query)
+
+# The site restriction is identical for every claim, so it is built (and URL-encoded) once at import
+TRUSTED_DOMAINS = tuple(TIER_TO_DOMAINS.get(1, []) + TIER_TO_DOMAINS.get(2, []))
+TRUSTED_SITES_Q = trusted_sites_query(TRUSTED_DOMAINS)
+TRUSTED_SITES_Q_ENCODED = encode_sites_suffix(TRUSTED_SITES_Q)
+
+def build_google_url(claim: str, sites_suffix: str = TRUSTED_SITES_Q_ENCODED) -> str:
+    """Builds a Google search URL for a claim, restricted to the sites in `sites_suffix` (Tier 1 & 2 by default)."""
+    # Byte-level encoder: skips quote_plus's str handling and space pass (spaces become %20, which Google reads the same)
+    quoted_claim = urllib.parse.quote_from_bytes(f'"{claim}"'.encode(), safe='')
+    return f"https://www.google.com/search?q={quoted_claim}{sites_suffix}"
+
+# --- Crawl4AI ---
+# Crawl4AI pulls in Playwright, BeautifulSoup and lxml, so the scripts that only touch it on some
+# paths import it on first use instead of at startup. The switches below are read per call, after
+# the scripts have loaded .env.
+def load_crawl4ai():
+    """Imports Crawl4AI on the first call (later calls are a sys.modules lookup) and returns the module."""
+    import crawl4ai
+    return crawl4ai
+
+def crawl_verbose() -> bool:
+    """Crawl4AI's per-step logging is only switched on with LOG_LEVEL=DEBUG."""
+    return os.getenv("LOG_LEVEL", "").upper() == "DEBUG"
+
+def crawl_cache_mode():
+    """Crawl4AI's on-disk cache turns a repeat analysis of the same URL into a local read; CRAWL_FRESH=1 always re-fetches."""
+    cache_mode = load_crawl4ai().CacheMode
+    return cache_mode.BYPASS if os.getenv("CRAWL_FRESH") else cache_mode.ENABLED
+
+# --- Entry point ---
+def run(coro):
+    """asyncio.run on uvloop's libuv-based loop (for the socket-heavy crawl/API work), or asyncio's where uvloop is missing (e.g. on Windows)."""
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    return asyncio.run(coro)
@@ -0,0 +1,123 @@
+# filename: redis_cache.py
+
+import asyncio
+import os
+import hashlib
+from typing import Any, Dict, List, Optional, Union
+
+import orjson
+import redis.asyncio as redis
+
+# --- Shared Redis connection ---
+# The API connects on startup; command-line runs never connect, so every helper
+# below degrades to a cache miss / no-op when there is no client.
+_redis: Optional[redis.Redis] = None
+
+def connect() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), decode_responses=True)
+    return _redis
+
+def get_redis() -> Optional[redis.Redis]:
+    return _redis
+
+async def close():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+async def get_many(keys: List[str]) -> List[Optional[str]]:
+    """Returns the cached value for each key (None on a miss), in the same order."""
+    if _redis is None or not keys:
+        return [None] * len(keys)
+    return await _redis.mget(keys)
+
+async def set_many(values: Dict[str, Union[str, bytes]], ttl: int):
+    """Stores every key/value pair with the same expiry in a single round-trip."""
+    if _redis is None or not values:
+        return
+    async with _redis.pipeline(transaction=False) as pipe:
+        for key, value in values.items():
+            pipe.set(key, value, ex=ttl)
+        await pipe.execute()
+
+# --- Analysis results (written by the worker, read by the API; both share this Redis) ---
+RESULT_TTL_SECONDS = 3600
+# Verdicts for URLs are stable; raw text is more likely to be a draft that gets edited
+URL_VERDICT_TTL_SECONDS = 3600
+TEXT_VERDICT_TTL_SECONDS = 300
+# The worker cancels an analysis after this long (arq job_timeout)
+JOB_TIMEOUT_SECONDS = 600
+# Upper bound on how long a crashed worker can leave a submission marked as in flight
+INFLIGHT_TTL_SECONDS = JOB_TIMEOUT_SECONDS
+# Streams give up waiting for a result this long after subscribing, even if the job died without publishing
+RESULT_WAIT_TIMEOUT_SECONDS = JOB_TIMEOUT_SECONDS + 60
+
+def _content_hash(user_input: str) -> str:
+    return hashlib.sha256(user_input.encode()).hexdigest()
+
+async def save_analysis_result(request_id: str, payload: Dict[str, Any]):
+    raw = orjson.dumps(payload)
+    await _redis.set(f"analysis:{request_id}", raw, ex=RESULT_TTL_SECONDS)
+    # Final states are also pushed to anyone streaming /results/{request_id}/stream
+    if payload["status"] != "processing":
+        await _redis.publish(f"analysis:{request_id}", raw)
+
+async def delete_analysis_result(request_id: str):
+    await _redis.delete(f"analysis:{request_id}")
+
+async def load_analysis_result(request_id: str) -> Optional[Dict[str, Any]]:
+    raw = await _redis.get(f"analysis:{request_id}")
+    return orjson.loads(raw) if raw else None
+
+async def wait_for_analysis_result(request_id: str) -> Optional[Dict[str, Any]]:
+    """Blocks until the analysis leaves the "processing" state and returns its final payload."""
+    async with _redis.pubsub() as pubsub:
+        # Subscribe before re-reading, so a result published in between cannot be missed
+        await pubsub.subscribe(f"analysis:{request_id}")
+        result = await load_analysis_result(request_id)
+        if result is None or result["status"] != "processing":
+            return result
+        try:
+            async with asyncio.timeout(RESULT_WAIT_TIMEOUT_SECONDS):
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        return orjson.loads(message["data"])
+        except TimeoutError:
+            pass
+        # Nothing was published in time: report whatever the key says now, or that the job was lost
+        result = await load_analysis_result(request_id)
+        if result is not None and result["status"] != "processing":
+            return result
+        return {"status": "error", "data": {"error_message": "Timed out waiting for the analysis result."}}
+
+def verdict_cache_key(user_input: str) -> str:
+    return f"verdict:{_content_hash(user_input)}"
+
+async def load_cached_verdict(user_input: str) -> Optional[Dict[str, Any]]:
+    raw = await _redis.get(verdict_cache_key(user_input))
+    return orjson.loads(raw) if raw else None
+
+async def cache_verdict(user_input: str, result_data: Dict[str, Any]):
+    ttl = URL_VERDICT_TTL_SECONDS if user_input.strip().startswith('http') else TEXT_VERDICT_TTL_SECONDS
+    await _redis.set(verdict_cache_key(user_input), orjson.dumps(result_data), ex=ttl)
+
+async def claim_inflight(user_input: str, request_id: str) -> Optional[str]:
+    """
+    Registers request_id as the running analysis for this content. Returns None when the
+    claim succeeds, or the request_id of the analysis already running for the same content.
+    SET NX is atomic, so concurrent duplicate submissions collapse onto one pipeline.
+    """
+    key = f"inflight:{_content_hash(user_input)}"
+    while True:
+        if await _redis.set(key, request_id, nx=True, ex=INFLIGHT_TTL_SECONDS):
+            return None
+        existing = await _redis.get(key)
+        # None means the other claim expired or was released in between; try to take it again
+        if existing is not None:
+            return existing
+
+async def release_inflight(user_input: str):
+    await _redis.delete(f"inflight:{_content_hash(user_input)}")
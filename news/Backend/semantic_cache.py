@@ -0,0 +1,105 @@
+# filename: semantic_cache.py
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# Semantic cache for LLM responses: a prompt whose embedding is close enough (cosine) to an
+# earlier prompt in the same namespace reuses that answer instead of paying for another call.
+# Entries are also chained to a context string that must match exactly (e.g. the evidence a
+# verdict was based on), so similar wording over different context never shares an answer.
+# Embeddings come from a small local sentence-transformers model. The dependency is optional;
+# without it every lookup is a miss and nothing is stored.
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    np = SentenceTransformer = None
+
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "_semantic_cache.sqlite")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+SIMILARITY_THRESHOLD = 0.95
+# Per namespace; past this the least recently used entries are evicted
+MAX_ENTRIES = 10_000
+
+_model = None
+_db: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+# (namespace, context hash) -> (row ids, matrix of unit-length embeddings); a dot product is the cosine similarity
+_index: dict = {}
+
+def enabled() -> bool:
+    return SentenceTransformer is not None
+
+def _connect() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        # Lookups run in worker threads (see lookup/store), always under _lock
+        _db = sqlite3.connect(SEMANTIC_CACHE_PATH, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS semantic_cache (id INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT, context_hash TEXT, vector BLOB, response TEXT, last_used INTEGER)")
+        _db.execute("CREATE INDEX IF NOT EXISTS semantic_cache_context ON semantic_cache (namespace, context_hash)")
+    return _db
+
+def embed(texts: list[str]):
+    """Unit-length float32 embeddings, one row per text."""
+    global _model
+    if _model is None:
+        _model = SentenceTransformer(EMBEDDING_MODEL)
+    return _model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def context_hash(context: str) -> str:
+    return hashlib.sha256(context.encode()).hexdigest()
+
+def _load_index(namespace: str, ctx: str):
+    if (namespace, ctx) not in _index:
+        rows = _connect().execute("SELECT id, vector FROM semantic_cache WHERE namespace = ? AND context_hash = ?", (namespace, ctx)).fetchall()
+        vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), -1) if rows else None
+        _index[(namespace, ctx)] = ([row[0] for row in rows], vectors)
+    return _index[(namespace, ctx)]
+
+def _lookup(namespace: str, text: str, context: str) -> Optional[str]:
+    with _lock:
+        # Only entries with the identical context are candidates; similarity is checked among those
+        ids, vectors = _load_index(namespace, context_hash(context))
+        if not ids: return None
+        scores = vectors @ embed([text])[0]
+        best = int(scores.argmax())
+        if scores[best] < SIMILARITY_THRESHOLD: return None
+        db = _connect()
+        row = db.execute("SELECT response FROM semantic_cache WHERE id = ?", (ids[best],)).fetchone()
+        db.execute("UPDATE semantic_cache SET last_used = ? WHERE id = ?", (int(time.time()), ids[best]))
+        db.commit()
+        return row[0] if row else None
+
+def _store(namespace: str, text: str, response: str, context: str):
+    with _lock:
+        ctx = context_hash(context)
+        ids, vectors = _load_index(namespace, ctx)
+        vector = embed([text])
+        db = _connect()
+        cursor = db.execute("INSERT INTO semantic_cache (namespace, context_hash, vector, response, last_used) VALUES (?, ?, ?, ?, ?)",
+                            (namespace, ctx, vector.tobytes(), response, int(time.time())))
+        _index[(namespace, ctx)] = (ids + [cursor.lastrowid], np.vstack([vectors, vector]) if ids else vector)
+        total = db.execute("SELECT COUNT(*) FROM semantic_cache WHERE namespace = ?", (namespace,)).fetchone()[0]
+        if total > MAX_ENTRIES:
+            db.execute("DELETE FROM semantic_cache WHERE id IN (SELECT id FROM semantic_cache WHERE namespace = ? ORDER BY last_used LIMIT ?)",
+                       (namespace, total - MAX_ENTRIES))
+            # Evicted rows may belong to any context, so drop this namespace's loaded indexes; they reload from SQLite
+            for key in [key for key in _index if key[0] == namespace]: _index.pop(key)
+        db.commit()
+
+async def lookup(namespace: str, text: str, context: str = "") -> Optional[str]:
+    """
+    Returns the response cached for the most similar earlier `text` stored with exactly the same
+    `context`, if it clears SIMILARITY_THRESHOLD.
+    """
+    if not enabled(): return None
+    return await asyncio.to_thread(_lookup, namespace, text, context)
+
+async def store(namespace: str, text: str, response: str, context: str = ""):
+    if not enabled(): return
+    await asyncio.to_thread(_store, namespace, text, response, context)
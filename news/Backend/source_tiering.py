@@ -1,4 +1,5 @@
-
+import urllib.parse
+from functools import lru_cache
 
 SOURCE_TIERS = {
     # Tier 1 (Highest Trust): Major international news wires
@@ -26,6 +27,37 @@ SOURCE_TIERS = {
     "theonion.com": "satire",
 }
 
+# Reverse index (tier -> domains), built once so callers never rescan SOURCE_TIERS
+TIER_TO_DOMAINS = {}
+for _domain, _tier in SOURCE_TIERS.items():
+    TIER_TO_DOMAINS.setdefault(_tier, []).append(_domain)
+
+# Suffix trie over reversed domain labels ("com" -> "bbc" -> tier), built once at import.
+# A lookup walks at most one node per label, and subdomains such as edition.bbc.com or
+# www.reuters.com resolve to the most specific listed domain.
+_TIER = "$"  # not a valid domain label, so it can't collide with a child
+
+def build_tier_trie(source_tiers: dict) -> dict:
+    trie = {}
+    for domain, tier in source_tiers.items():
+        node = trie
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        node[_TIER] = tier
+    return trie
+
+_TRIE = build_tier_trie(SOURCE_TIERS)
+
+def lookup_tier(host: str, trie: dict = _TRIE):
+    """Tier of the most specific listed domain `host` falls under, or None if it is not listed."""
+    node, tier = trie, None
+    for label in reversed(host.split('.')):
+        node = node.get(label)
+        if node is None: break
+        tier = node.get(_TIER, tier)
+    return tier
+
+@lru_cache(maxsize=4096)
 def get_source_tier(url: str) -> int | str:
     """
     Returns the credibility tier of a news source based on its domain.
@@ -34,8 +66,9 @@ def get_source_tier(url: str) -> int | str:
     if not url.startswith('http'):
         return "N/A (Raw Text Input)"
         
-    try:
-        domain = url.split('/')[2].replace('www.', '')
-        return SOURCE_TIERS.get(domain, 3) # Default to Tier 3 (Medium Trust)
-    except IndexError:
-        return "Invalid URL"
\ No newline at end of file
+    # hostname is lowercased and drops any port or user:password@ prefix
+    host = urllib.parse.urlsplit(url).hostname
+    if not host:
+        return "Invalid URL"
+    tier = lookup_tier(host)
+    return 3 if tier is None else tier # Default to Tier 3 (Medium Trust)
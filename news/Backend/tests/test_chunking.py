@@ -0,0 +1,51 @@
+import inspect
+import math
+
+import pytest
+
+from main4 import CHUNK_OVERLAP, MAX_PROMPT_CHARS, chunk_text, even_chunk_size
+
+
+def test_chunk_text_empty_text_is_one_empty_chunk():
+    assert list(chunk_text("")) == [""]
+
+
+def test_chunk_text_shorter_than_overlap_is_one_chunk():
+    assert list(chunk_text("short", chunk_size=100, overlap=10)) == ["short"]
+
+
+def test_chunk_text_exactly_chunk_size_is_one_chunk():
+    text = "x" * 100
+    assert list(chunk_text(text, chunk_size=100, overlap=10)) == [text]
+
+
+def test_chunk_text_one_past_chunk_size_adds_a_chunk_of_new_text():
+    chunks = list(chunk_text("x" * 101, chunk_size=100, overlap=10))
+    assert [len(chunk) for chunk in chunks] == [100, 11]
+
+
+def test_chunk_text_is_lazy():
+    assert inspect.isgenerator(chunk_text("abc"))
+
+
+@pytest.mark.parametrize("length", [150, 190, 191, 1000, 1234])
+def test_chunk_text_covers_text_with_overlap(length):
+    text = "".join(chr(ord("a") + i % 26) for i in range(length))
+    chunks = list(chunk_text(text, chunk_size=100, overlap=10))
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "".join([chunks[0]] + [chunk[10:] for chunk in chunks[1:]]) == text
+    # The last chunk always contributes text the previous one did not cover
+    assert len(chunks) == 1 or len(chunks[-1]) > 10
+
+
+@pytest.mark.parametrize("length", [0, 1, CHUNK_OVERLAP, MAX_PROMPT_CHARS])
+def test_even_chunk_size_within_budget_is_one_chunk(length):
+    assert len(list(chunk_text("x" * length, even_chunk_size(length)))) == 1
+
+
+@pytest.mark.parametrize("length", [MAX_PROMPT_CHARS + 1, 2 * MAX_PROMPT_CHARS, 100_000, 250_001])
+def test_even_chunk_size_uses_fewest_even_chunks(length):
+    chunks = [len(chunk) for chunk in chunk_text("x" * length, even_chunk_size(length))]
+    assert len(chunks) == math.ceil((length - CHUNK_OVERLAP) / (MAX_PROMPT_CHARS - CHUNK_OVERLAP))
+    assert max(chunks) <= MAX_PROMPT_CHARS
+    assert max(chunks) - min(chunks) <= len(chunks)
@@ -0,0 +1,36 @@
+import orjson
+import pytest
+
+from main4 import _extract_claim_strings, select_top_claims
+
+
+def test_extract_claim_strings_reads_claims_and_bias():
+    claims, biases = [], []
+    response = {"claims": ["A happened.", {"text": "B happened."}, 3], "bias_rating": 2, "bias_notes": "Mild."}
+    _extract_claim_strings(orjson.dumps(response).decode(), claims, biases)
+    assert claims == ["A happened.", "B happened."]
+    assert biases == [(2, "Mild.")]
+
+
+def test_extract_claim_strings_ignores_non_object_responses():
+    claims, biases = [], []
+    _extract_claim_strings('["A happened."]', claims, biases)
+    _extract_claim_strings('{"claims": "A happened."}', claims, biases)
+    assert claims == [] and biases == []
+
+
+def test_extract_claim_strings_rejects_truncated_json():
+    with pytest.raises(orjson.JSONDecodeError):
+        _extract_claim_strings('{"claims": ["A happ', [], [])
+
+
+def test_select_top_claims_ranks_across_the_whole_article():
+    # The most informative claims come last, as they would from a later chunk
+    claims = ["It rose.", "Prices fell.", "NASA launched Artemis II in 2026.", "The WHO reported 1,200 cases in Lagos."]
+    assert select_top_claims(claims, 2) == claims[2:]
+
+
+def test_select_top_claims_keeps_extraction_order():
+    claims = ["The WHO reported 1,200 cases in Lagos.", "It rose.", "NASA launched Artemis II in 2026."]
+    assert select_top_claims(claims, 2) == [claims[0], claims[2]]
+    assert select_top_claims(claims, 5) == claims
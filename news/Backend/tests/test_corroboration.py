@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import main4
+import page_cache
+
+
+class OutOfOrderCrawler:
+    """arun_many stand-in that answers in reverse order, as a dispatcher finishing pages out of order would."""
+
+    def __init__(self, pages):
+        self.pages = pages  # url -> extracted content, or None for a failed crawl
+        self.requested = []
+
+    async def arun_many(self, urls, config):
+        self.requested.append(list(urls))
+        return [SimpleNamespace(url=url, success=self.pages[url] is not None, extracted_content=self.pages[url]) for url in reversed(urls)]
+
+
+@pytest.fixture
+def isolated_page_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_PATH", str(tmp_path / "page_cache.sqlite"))
+    monkeypatch.setattr(page_cache, "_db", None)
+    monkeypatch.setattr(main4, "GOOGLE_CSE_ID", None)
+    yield
+    if page_cache._db is not None: page_cache._db.close()
+
+
+def serp(title):
+    return orjson.dumps([{"title": title, "link": f"https://reuters.com/{title}"}]).decode()
+
+
+def test_results_are_matched_to_claims_by_url(isolated_page_cache, monkeypatch):
+    monkeypatch.setattr(main4, "MAX_INFLIGHT", 2)  # several windows, each answered out of order
+    claims = [f"claim {i}" for i in range(5)]
+    crawler = OutOfOrderCrawler({main4.build_google_url(claim): serp(claim) for claim in claims})
+    results = asyncio.run(main4.batch_find_trusted_corroboration(crawler, claims))
+    assert [result[0]["title"] for result in results] == claims
+    assert [len(window) for window in crawler.requested] == [2, 2, 1]
+
+
+def test_cached_pages_hold_their_own_claims_results(isolated_page_cache):
+    claims = ["alpha", "beta"]
+    crawler = OutOfOrderCrawler({main4.build_google_url("alpha"): serp("alpha"), main4.build_google_url("beta"): None})
+    asyncio.run(main4.batch_find_trusted_corroboration(crawler, claims))
+    assert orjson.loads(page_cache.load_recent("serp", main4.build_google_url("alpha")))[0]["title"] == "alpha"
+    # Failed crawls are not cached, so they are retried next time
+    assert page_cache.load_recent("serp", main4.build_google_url("beta")) is None
+
+
+class OutOfOrderSerpCrawler:
+    """Like OutOfOrderCrawler, but returns raw result-page HTML for final_main's XPath parser."""
+
+    async def arun_many(self, urls, config):
+        return [SimpleNamespace(url=url, success=True, html=self.page(url)) for url in reversed(urls)]
+
+    @staticmethod
+    def page(url):
+        return f'<html><body><div class="g"><a href="{url}"><h3>{url}</h3></a></div></body></html>'
+
+
+def test_final_main_corroboration_is_matched_to_claims_by_url(monkeypatch):
+    import final_main
+    monkeypatch.setattr(final_main, "MAX_INFLIGHT", 2)
+    claims = [f"claim {i}" for i in range(5)]
+    corroborations = asyncio.run(final_main.batch_find_trusted_corroboration(OutOfOrderSerpCrawler(), claims))
+    for claim in claims:
+        assert corroborations[claim][0]["link"] == final_main.build_google_url(claim, final_main._TRUSTED_SITES_Q_ENCODED)
+
+
+def test_parse_serp_reads_title_link_snippet_and_limits_results():
+    from final_main import parse_serp
+    page = """<html><body>
+      <div class="g tF2Cxc"><a href="https://reuters.com/a"><h3>Result A</h3></a><div data-sncf="2"> Snippet A </div></div>
+      <div class="gx"><a href="https://not-a-result.com"><h3>Not a result</h3></a></div>
+      <div class="g"><a href="https://apnews.com/b"><h3>Result B</h3></a></div>
+      <div class="g"><a href="https://bbc.com/c"><h3>Result C</h3></a></div>
+    </body></html>"""
+    assert parse_serp(page) == [
+        {"title": "Result A", "link": "https://reuters.com/a", "snippet": "Snippet A"},
+        {"title": "Result B", "link": "https://apnews.com/b"},
+    ]
+    assert len(parse_serp(page, limit=5)) == 3
+
+
+def test_parse_serp_no_results():
+    from final_main import parse_serp
+    assert parse_serp("<html><body><p>No results</p></body></html>") == []
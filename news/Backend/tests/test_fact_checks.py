@@ -0,0 +1,53 @@
+import asyncio
+
+import httpx
+import pytest
+
+import fact_check_cache
+import main4
+
+
+@pytest.fixture
+def fact_check_api(monkeypatch, tmp_path):
+    """Points main4 at a mock Fact Check API (query -> (status, body)) and an empty on-disk cache."""
+    answers = {}
+
+    def handler(request):
+        status, body = answers[request.url.params["query"]]
+        return httpx.Response(status, content=body)
+
+    monkeypatch.setattr(fact_check_cache, "FACT_CHECK_CACHE_PATH", str(tmp_path / "fact_check.sqlite"))
+    monkeypatch.setattr(fact_check_cache, "_db", None)
+    monkeypatch.setattr(main4, "GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(main4, "MAX_RETRIES", 0)
+    monkeypatch.setattr(main4, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    yield answers
+    if fact_check_cache._db is not None: fact_check_cache._db.close()
+
+
+REVIEW = b'{"claims": [{"claimReview": [{"textualRating": "False", "publisher": {"name": "PolitiFact"}}]}]}'
+
+
+def test_failed_and_non_json_answers_do_not_abort_the_batch(fact_check_api):
+    fact_check_api.update({
+        "rated": (200, REVIEW),
+        "unknown": (200, b"{}"),
+        "rate limited": (429, b"<html>Too Many Requests</html>"),
+        "server error": (503, b""),
+        "garbled": (200, b"<html>not json</html>"),
+    })
+    results = asyncio.run(main4.batch_query_fact_checks(list(fact_check_api)))
+    assert results == {
+        "rated": "RATING: False (Publisher: PolitiFact)",
+        "unknown": "No fact-check found.",
+        "rate limited": "API query failed.",
+        "server error": "API query failed.",
+        "garbled": "API query failed.",
+    }
+
+
+def test_only_answered_queries_are_cached(fact_check_api):
+    fact_check_api.update({"rated": (200, REVIEW), "rate limited": (429, b"")})
+    asyncio.run(main4.batch_query_fact_checks(["rated", "rate limited"]))
+    cached = fact_check_cache.get_many([fact_check_cache.make_key("rated"), fact_check_cache.make_key("rate limited")])
+    assert list(cached.values()) == ["RATING: False (Publisher: PolitiFact)"]
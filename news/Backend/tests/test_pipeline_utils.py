@@ -0,0 +1,54 @@
+import urllib.parse
+
+import httpx
+
+from pipeline_utils import TRUSTED_DOMAINS, build_google_url, dedupe_claims, normalize_claim, retry_delay, run
+
+
+def test_normalize_claim_strips_list_markers_case_and_punctuation():
+    assert normalize_claim("- The Sky is BLUE!") == "the sky is blue"
+    assert normalize_claim("3. The sky is blue") == "the sky is blue"
+    assert normalize_claim("2) The sky is blue.") == "the sky is blue"
+
+
+def test_normalize_claim_keeps_leading_numbers_that_are_not_markers():
+    assert normalize_claim("2.5 million people voted") == "2 5 million people voted"
+
+
+def test_dedupe_claims_keeps_first_wording_and_order():
+    claims = ["* Prices rose 5%.", "Wages fell.", "prices rose 5%", "1. Wages fell!"]
+    assert dedupe_claims(claims) == ["* Prices rose 5%.", "Wages fell."]
+
+
+def test_dedupe_claims_empty():
+    assert dedupe_claims([]) == []
+
+
+def test_retry_delay_uses_retry_after():
+    assert retry_delay(httpx.Response(429, headers={"Retry-After": "7"}), 0) == 7.0
+
+
+def test_retry_delay_backs_off_exponentially():
+    response = httpx.Response(503)
+    assert [retry_delay(response, attempt) for attempt in range(3)] == [1, 2, 4]
+
+
+def test_retry_delay_ignores_http_date_retry_after():
+    assert retry_delay(httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}), 1) == 2
+
+
+def test_build_google_url_quotes_claim_and_restricts_sites():
+    url = build_google_url('Rates rose "sharply" & fast')
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["q"][0]
+    assert query.startswith('"Rates rose "sharply" & fast" ')
+    assert all(f"site:{domain}" in query for domain in TRUSTED_DOMAINS)
+
+
+def test_build_google_url_custom_suffix():
+    assert build_google_url("x", "+site%3Aexample.com") == "https://www.google.com/search?q=%22x%22+site%3Aexample.com"
+
+
+def test_run_returns_the_coroutine_result():
+    async def answer():
+        return 42
+    assert run(answer()) == 42
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+import redis_cache
+
+
+class FakeRedis:
+    """Just the SET NX / GET / DELETE subset claim_inflight and release_inflight use."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data: return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_cache, "_redis", fake)
+    return fake
+
+
+def test_claim_inflight_first_submission_wins(fake_redis):
+    assert asyncio.run(redis_cache.claim_inflight("https://a.com/x", "req-1")) is None
+
+
+def test_claim_inflight_collapses_duplicates_onto_the_running_request(fake_redis):
+    async def submit_all():
+        return await asyncio.gather(*[redis_cache.claim_inflight("https://a.com/x", f"req-{i}") for i in range(5)])
+    owners = asyncio.run(submit_all())
+    assert owners[0] is None
+    assert owners[1:] == ["req-0"] * 4
+
+
+def test_claim_inflight_is_per_content(fake_redis):
+    async def submit_both():
+        return [await redis_cache.claim_inflight("https://a.com/x", "req-1"), await redis_cache.claim_inflight("https://a.com/y", "req-2")]
+    assert asyncio.run(submit_both()) == [None, None]
+
+
+def test_release_inflight_allows_a_new_run(fake_redis):
+    async def run():
+        await redis_cache.claim_inflight("text", "req-1")
+        await redis_cache.release_inflight("text")
+        return await redis_cache.claim_inflight("text", "req-2")
+    assert asyncio.run(run()) is None
+
+
+class ExpiringRedis(FakeRedis):
+    """The other submission's claim expires between our failed SET NX and the GET."""
+
+    async def get(self, key):
+        self.data.pop(key, None)
+        return None
+
+
+def test_claim_inflight_retakes_a_claim_that_expired_in_between(monkeypatch):
+    fake = ExpiringRedis()
+    fake.data[f"inflight:{redis_cache._content_hash('text')}"] = "req-old"
+    monkeypatch.setattr(redis_cache, "_redis", fake)
+    assert asyncio.run(redis_cache.claim_inflight("text", "req-new")) is None
+    assert fake.data[f"inflight:{redis_cache._content_hash('text')}"] == "req-new"
@@ -0,0 +1,49 @@
+import final_main
+from source_tiering import build_tier_trie, get_source_tier, lookup_tier
+
+
+def test_listed_domain():
+    assert get_source_tier("https://reuters.com/world/story") == 1
+
+
+def test_subdomains_resolve_to_listed_domain():
+    assert get_source_tier("https://www.reuters.com/world") == 1
+    assert get_source_tier("https://edition.bbc.com/news") == 2
+
+
+def test_host_is_lowercased_and_port_and_credentials_dropped():
+    assert get_source_tier("https://user:pw@WWW.NYTimes.com:8443/a") == 2
+
+
+def test_unlisted_domain_defaults_to_tier_3():
+    assert get_source_tier("https://example.com/a") == 3
+
+
+def test_suffix_of_a_label_does_not_match():
+    # "notreuters.com" is a different registrable domain, not a subdomain of reuters.com
+    assert get_source_tier("https://notreuters.com/a") == 3
+
+
+def test_non_http_input():
+    assert get_source_tier("raw_text_input") == "N/A (Raw Text Input)"
+
+
+def test_invalid_url():
+    assert get_source_tier("http:///path-only") == "Invalid URL"
+
+
+
+def test_most_specific_domain_wins():
+    trie = build_tier_trie({"indiatimes.com": 4, "timesofindia.indiatimes.com": 3})
+    assert lookup_tier("timesofindia.indiatimes.com", trie) == 3
+    assert lookup_tier("m.timesofindia.indiatimes.com", trie) == 3
+    assert lookup_tier("economictimes.indiatimes.com", trie) == 4
+    assert lookup_tier("indiatimes.org", trie) is None
+
+
+def test_final_main_tiers_use_its_own_table():
+    assert final_main.get_source_tier("https://edition.cnn.com/story") == 3
+    assert final_main.get_source_tier("https://www.reuters.com/world") == 1
+    assert final_main.get_source_tier("https://dailymail.co.uk/news") == 4
+    assert final_main.get_source_tier("https://example.com/a") == 3
+    assert final_main.get_source_tier("raw://<p>text</p>") == 3
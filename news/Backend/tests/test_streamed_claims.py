@@ -0,0 +1,40 @@
+from main3 import _take_streamed_claims
+
+
+def feed(deltas):
+    """Feeds the deltas one at a time, returning the claims completed after each one."""
+    buffer, pos, seen = "", None, []
+    for delta in deltas:
+        buffer += delta
+        claims, pos = _take_streamed_claims(buffer, pos)
+        seen.append(claims)
+    return seen
+
+
+def test_nothing_before_the_claims_array_opens():
+    assert _take_streamed_claims('{"bias": {"analysis": "x"', None) == ([], None)
+
+
+def test_claims_are_emitted_once_each_as_they_complete():
+    deltas = ['{"claims": ["First', ' claim", "Sec', 'ond claim"', ', "Third"]', ', "bias": {}}']
+    assert feed(deltas) == [[], ["First claim"], ["Second claim"], ["Third"], []]
+
+
+def test_escaped_quotes_inside_a_claim():
+    assert feed(['{"claims": ["He said \\"no\\"", "x"]}']) == [['He said "no"', "x"]]
+
+
+def test_split_escape_sequence_waits_for_the_rest():
+    assert feed(['{"claims": ["a \\', 'u00e9 b"]']) == [[], ["a é b"]]
+
+
+def test_truncated_stream_keeps_only_completed_claims():
+    buffer = '{"claims": ["Complete claim.", "Cut off mid'
+    claims, pos = _take_streamed_claims(buffer, None)
+    assert claims == ["Complete claim."]
+    # Resuming on the same truncated buffer yields nothing new
+    assert _take_streamed_claims(buffer, pos) == ([], pos)
+
+
+def test_empty_claims_array():
+    assert feed(['{"claims": [', ']}']) == [[], []]
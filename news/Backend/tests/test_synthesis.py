@@ -0,0 +1,75 @@
+import asyncio
+
+import orjson
+import pytest
+
+import final_main
+from final_main import SYNTHESIS_BATCH_CHARS, SYNTHESIS_BATCH_CLAIMS, match_synthesis_results, normalize_verdict, pack_synthesis_batches
+
+
+def item(i, size=10):
+    return {"id": i, "claim": f"claim {i}", "fact_check": "x" * size, "corroboration": []}
+
+
+def test_pack_synthesis_batches_empty():
+    assert pack_synthesis_batches([]) == []
+
+
+def test_pack_synthesis_batches_caps_claims_per_batch():
+    batches = pack_synthesis_batches([item(i) for i in range(SYNTHESIS_BATCH_CLAIMS * 2 + 1)])
+    assert [len(batch) for batch in batches] == [SYNTHESIS_BATCH_CLAIMS, SYNTHESIS_BATCH_CLAIMS, 1]
+
+
+def test_pack_synthesis_batches_caps_characters_per_batch():
+    items = [item(i, SYNTHESIS_BATCH_CHARS // 3) for i in range(5)]
+    batches = pack_synthesis_batches(items)
+    assert all(sum(len(orjson.dumps(entry)) for entry in batch) <= SYNTHESIS_BATCH_CHARS for batch in batches)
+    assert [entry for batch in batches for entry in batch] == items
+
+
+def test_pack_synthesis_batches_oversized_item_gets_its_own_batch():
+    items = [item(0), item(1, SYNTHESIS_BATCH_CHARS * 2), item(2)]
+    assert [[entry["id"] for entry in batch] for batch in pack_synthesis_batches(items)] == [[0], [1], [2]]
+
+
+def test_match_synthesis_results_by_id_not_position():
+    batch = [item(0), item(1)]
+    results = [{"id": 1, "verdict": "Disputed"}, {"id": "0", "verdict": "Well-Supported"}]
+    matched = match_synthesis_results(batch, results)
+    assert matched["claim 0"]["verdict"] == "Well-Supported"
+    assert matched["claim 1"]["verdict"] == "Disputed"
+
+
+@pytest.mark.parametrize("results", [
+    None,
+    {"id": 0},
+    [{"id": 0, "verdict": "Disputed"}],                                    # dropped item
+    [{"id": 0}, {"id": 0}],                                                # duplicated id
+    [{"id": 0}, {"id": 2}],                                                # unknown id
+    [{"id": 0}, "Disputed"],                                               # non-object entry
+    [{"id": 0}, {"id": 1}, {"id": 2}],                                     # extra item
+])
+def test_match_synthesis_results_rejects_mismatched_batches(results):
+    assert match_synthesis_results([item(0), item(1)], results) is None
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("Well-Supported", "Well-Supported"),
+    ("well-supported.", "Well-Supported"),
+    ("[Disputed]", "Disputed"),
+    ("Verdict: Lacks Evidence", "Lacks Evidence"),
+    ("PARTIALLY SUPPORTED", "Partially Supported"),
+    ("Unclear", "Unclear"),
+    (None, None),
+])
+def test_normalize_verdict(answer, expected):
+    assert normalize_verdict(answer) == expected
+
+
+def test_article_without_claims_is_a_completed_report(monkeypatch):
+    async def no_claims(crawler, html_content):
+        return {"claims": [], "bias_report": "Bias rating: 1. Neutral."}
+    monkeypatch.setattr(final_main, "phase2_deconstruct_article", no_claims)
+    report = asyncio.run(final_main.run_pipeline(None, "An opinion piece with nothing to check."))
+    assert report["claim_verifications"] == []
+    assert report["score_components"] == {"Source": 75, "Evidence": 0, "Bias": 100}
@@ -0,0 +1,80 @@
+# filename: worker.py
+#
+# Runs queued analyses outside the API process. Start with:  arq worker.WorkerSettings
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from arq.connections import RedisSettings
+from crawl4ai import AsyncWebCrawler
+
+from final_main import analyze_article, close_http_client, BROWSER_CONFIG
+import redis_cache
+
+load_dotenv()
+
+# Each analysis launches browser pages and dozens of LLM calls, so cap how many run at once per worker
+MAX_CONCURRENT_ANALYSES = int(os.getenv("MAX_CONCURRENT_ANALYSES", "4"))
+# Browsers launched once at startup and lent to analyses, instead of a cold Chromium per job
+CRAWLER_POOL_SIZE = int(os.getenv("CRAWLER_POOL_SIZE", "2"))
+
+async def analyze_task(ctx, request_id: str, user_input: str):
+    """Runs one queued analysis and stores its outcome under analysis:{request_id}."""
+    # Elapsed time is measured here with a monotonic clock, so /results never re-parses timestamps
+    started_at = time.monotonic()
+    crawler_pool: asyncio.Queue = ctx["crawler_pool"]
+    try:
+        crawler = await crawler_pool.get()
+        try:
+            result_data = await analyze_article(user_input, crawler)
+        finally:
+            crawler_pool.put_nowait(crawler)
+        await redis_cache.save_analysis_result(request_id, {
+            "status": "completed",
+            "processing_time": round(time.monotonic() - started_at, 2),
+            "data": result_data
+        })
+        await redis_cache.cache_verdict(user_input, result_data)
+    except asyncio.CancelledError:
+        # arq cancels the job at job_timeout; record that before letting the cancellation through
+        print(f"Background analysis cancelled for {request_id}")
+        await redis_cache.save_analysis_result(request_id, {
+            "status": "error",
+            "processing_time": round(time.monotonic() - started_at, 2),
+            "data": {"error_message": "Analysis timed out or was cancelled."}
+        })
+        raise
+    except Exception as e:
+        print(f"Background analysis failed for {request_id}: {e}")
+        await redis_cache.save_analysis_result(request_id, {
+            "status": "error",
+            "processing_time": round(time.monotonic() - started_at, 2),
+            "data": {"error_message": str(e)}
+        })
+    finally:
+        await redis_cache.release_inflight(user_input)
+
+async def startup(ctx):
+    redis_cache.connect()
+    crawler_pool = asyncio.Queue()
+    for _ in range(CRAWLER_POOL_SIZE):
+        crawler = AsyncWebCrawler(config=BROWSER_CONFIG)
+        await crawler.start()
+        crawler_pool.put_nowait(crawler)
+    ctx["crawler_pool"] = crawler_pool
+
+async def shutdown(ctx):
+    crawler_pool: asyncio.Queue = ctx["crawler_pool"]
+    while not crawler_pool.empty():
+        await crawler_pool.get_nowait().close()
+    await close_http_client()
+    await redis_cache.close()
+
+class WorkerSettings:
+    functions = [analyze_task]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    max_jobs = MAX_CONCURRENT_ANALYSES
+    job_timeout = redis_cache.JOB_TIMEOUT_SECONDS